@@ -0,0 +1,61 @@
+import hashlib
+from calendar import timegm
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+
+from .models import DataVersion
+
+
+def is_not_modified(request, etag, last_modified):
+    """Whether the request's conditions (If-None-Match, If-Modified-Since) hold."""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        etags = parse_etags(if_none_match)
+        return '*' in etags or etag.strip('"') in etags
+    if_modified_since = parse_http_date_safe(
+        request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return if_modified_since is not None and last_modified <= if_modified_since
+
+
+def cache_response(view):
+    """
+    Caches the (GET) responses of a view, until the data version
+    changes (see DataVersion). Responses carry an ETag and
+    Last-Modified, so clients can revalidate; while the response is
+    cached, the view doesn't run at all.
+
+    Only successful responses are cached (and revalidated), per URL
+    and Accept header. Until the data first changes, nothing is cached.
+    """
+    @wraps(view)
+    def cached_view(request, *args, **kwargs):
+        data_version = DataVersion.get_current()
+        if request.method not in ('GET', 'HEAD') or data_version is None:
+            return view(request, *args, **kwargs)
+
+        key = 'response:%d:%s' % (data_version.version, hashlib.md5(
+            '%s %s %s' % (request.method, request.get_full_path(),
+                          request.META.get('HTTP_ACCEPT', ''))).hexdigest())
+        response = cache.get(key)
+        if response is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200 or response.streaming:
+                return response
+            if hasattr(response, 'render'):
+                response.render()
+            patch_vary_headers(response, ('Accept',))
+            cache.set(key, response)
+
+        etag = quote_etag(str(data_version.version))
+        last_modified = timegm(data_version.updated.utctimetuple())
+        if is_not_modified(request, etag, last_modified):
+            response = HttpResponseNotModified()
+            patch_vary_headers(response, ('Accept',))
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+    return cached_view
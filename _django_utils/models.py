@@ -0,0 +1,48 @@
+from django.contrib.admin.models import LogEntry
+from django.db import models
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.encoding import python_2_unicode_compatible
+
+from generic_dedupe.signals import dedupe_applied, dedupe_reverted
+
+
+@python_2_unicode_compatible
+class DataVersion(models.Model):
+    """
+    Version of the data served by the API: bumped whenever the data
+    changes (after each load, and on changes through the admin), so
+    that cached responses are no longer used (see cache_response).
+    """
+    version = models.IntegerField(default=0)
+    updated = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def get_current(cls):
+        """The current version (None until the data first changes)."""
+        return cls.objects.filter(id=1).first()
+
+    @classmethod
+    def bump(cls):
+        """Moves to a new version (e.g., after loading data)."""
+        if not cls.objects.filter(id=1).update(
+                version=models.F('version') + 1, updated=timezone.now()):
+            cls.objects.get_or_create(id=1, defaults=dict(version=1))
+        return cls.get_current()
+
+    def __str__(self):
+        return 'Version %d (%s)' % (self.version, self.updated)
+
+
+@receiver(post_save, sender=LogEntry)
+def bump_data_version_on_admin_change(sender, instance, created, **kwargs):
+    """Changes through the admin are logged."""
+    if created:
+        DataVersion.bump()
+
+
+@receiver([dedupe_applied, dedupe_reverted])
+def bump_data_version_on_dedupe(sender, **kwargs):
+    """Deduping (and reverting) moves data in bulk, without saving log entries one by one."""
+    DataVersion.bump()
@@ -0,0 +1,148 @@
+import base64
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import replace_query_param
+
+STREAM_CONTENT_TYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Rows fetched per query, when streaming.
+STREAM_PAGE_SIZE = 1000
+
+
+class KeysetPagination(object):
+    """
+    Pages through a queryset by its ordering fields ("keyset", or
+    cursor, pagination): each page starts after the last row of the
+    previous one, so pages are stable and cheap however deep.
+
+    The ordering must be unique (end with the primary key).
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 100
+    max_page_size = 1000
+
+    def __init__(self, ordering):
+        self.ordering = ordering
+
+    @classmethod
+    def is_requested(cls, request):
+        """Paginating is opt-in, by asking for a page size or cursor."""
+        params = request.query_params
+        return cls.cursor_query_param in params or cls.page_size_query_param in params
+
+    def get_values(self, obj):
+        """The object's ordering values."""
+        return [getattr(obj, field.lstrip('-')) for field in self.ordering]
+
+    def encode_cursor(self, obj):
+        return base64.urlsafe_b64encode(json.dumps(self.get_values(obj), cls=DjangoJSONEncoder))
+
+    def decode_cursor(self, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(str(cursor)))
+        except (TypeError, ValueError):
+            raise NotFound('Invalid cursor')
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound('Invalid cursor')
+        return values
+
+    def after(self, values):
+        """Filter for rows after the given ordering values."""
+        after = Q()
+        for fi, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = '%s__%s' % (name, 'lt' if field.startswith('-') else 'gt')
+            equal = dict([(prev.lstrip('-'), value) for prev, value
+                          in zip(self.ordering[:fi], values[:fi])])
+            after |= Q(**dict(equal, **{lookup: values[fi]}))
+        return after
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(
+                self.page_size_query_param, self.page_size))
+        except ValueError:
+            raise ParseError('Invalid page_size')
+        if page_size < 1:
+            raise ParseError('Invalid page_size')
+        return min(page_size, self.max_page_size)
+
+    def paginate_queryset(self, queryset, request):
+        """A page of the queryset; sets next_url if there are more."""
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.after(self.decode_cursor(cursor)))
+
+        page = list(queryset[:page_size + 1])
+        self.next_url = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_url = replace_query_param(
+                request.build_absolute_uri(), self.cursor_query_param,
+                self.encode_cursor(page[-1]))
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.next_url, 'results': data})
+
+    def iterate_queryset(self, queryset, page_size):
+        """
+        All of the queryset, in order, fetched page_size rows at a time
+        (each page after the last row of the one before).
+        """
+        queryset = queryset.order_by(*self.ordering)
+        page = list(queryset[:page_size])
+        while page:
+            for obj in page:
+                yield obj
+            if len(page) < page_size:
+                break
+            page = list(queryset.filter(self.after(self.get_values(page[-1])))[:page_size])
+
+
+def stream_response(queryset, ordering, serializer_class, stream_format, **kwargs):
+    """
+    Streams the serialized queryset, row by row, as a JSON list or as
+    newline-delimited JSON (stream_format 'json' or 'ndjson'); rows are
+    never all in memory.
+
+    Rows are read in (unique) ordering, STREAM_PAGE_SIZE at a time, as
+    KeysetPagination pages; a single query's rows would all be fetched
+    (by MySQLdb) before the first one is serialized.
+    """
+    if stream_format not in STREAM_CONTENT_TYPES:
+        raise ParseError('Invalid stream format; select from %s' % (
+            sorted(STREAM_CONTENT_TYPES.keys())))
+
+    paginator = KeysetPagination(ordering=ordering)
+    objs = paginator.iterate_queryset(queryset, STREAM_PAGE_SIZE)
+
+    def to_json(obj):
+        return json.dumps(serializer_class(obj, **kwargs).data, cls=JSONEncoder)
+
+    def generate_ndjson():
+        for obj in objs:
+            yield to_json(obj) + '\n'
+
+    def generate_json():
+        separator = '['
+        for obj in objs:
+            yield separator + to_json(obj)
+            separator = ','
+        yield '[]' if separator == '[' else ']'
+
+    generate = generate_json if stream_format == 'json' else generate_ndjson
+    return StreamingHttpResponse(
+        generate(), content_type=STREAM_CONTENT_TYPES[stream_format])
@@ -1,5 +1,8 @@
 from rest_framework import serializers
 
+# Bookkeeping columns that aren't part of the API.
+INTERNAL_FIELDS = ('concrete_type',)
+
 
 def as_money(num, precision=0.01):
     if num is None:
@@ -8,7 +11,10 @@ def as_money(num, precision=0.01):
 
 
 class ExtendedModelSerializer(serializers.ModelSerializer):
-    """ModelSerializer with '__init__(exclude)', '__init__(rename)', Meta.rename."""
+    """
+    ModelSerializer with '__init__(exclude)', '__init__(rename)', Meta.rename;
+    INTERNAL_FIELDS are never serialized.
+    """
 
     def __init__(self, model=None, exclude=None, rename=None, *args, **kwargs):
         self.exclude = exclude or tuple()
@@ -17,6 +23,8 @@ class ExtendedModelSerializer(serializers.ModelSerializer):
 
     def get_fields(self):
         fields = super(ExtendedModelSerializer, self).get_fields()
+        for field_name in INTERNAL_FIELDS:
+            fields.pop(field_name, None)
 
         try:
             # Removing fields: local (class-level taken care of by super call)
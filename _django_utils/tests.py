@@ -1,7 +1,15 @@
+import json
+
+from django.contrib.admin.models import CHANGE, LogEntry
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
 from django.db import models
 from django.test import TestCase
 
+from _django_utils.models import DataVersion
 from _django_utils.serializers import as_money, ExtendedModelSerializer
+from locality.models import City, State
 
 
 class AsMoneyTest(TestCase):
@@ -22,6 +30,10 @@ class AsMoneyTest(TestCase):
 class DummyModel(models.Model):
     f1 = models.CharField()
     f2 = models.IntegerField()
+    concrete_type = models.CharField()
+
+    class Meta:
+        managed = False  # no table (only serializers are tested)
 
 
 class ExtendedModelSerializerTest(TestCase):
@@ -42,3 +54,66 @@ class ExtendedModelSerializerTest(TestCase):
 
         self.assertIn('foo', DummySerializer().get_fields())
         self.assertNotIn('f2', DummySerializer().get_fields())
+
+    def test_internal_fields(self):
+        class DummySerializer(ExtendedModelSerializer):
+            class Meta:
+                model = DummyModel
+
+        self.assertEqual(set(['id', 'f1', 'f2']), set(DummySerializer().get_fields()))
+
+
+class CacheResponseTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.city = City.objects.create(name='Oakland',
+                                        state=State.objects.create(name='California'))
+        self.url = reverse('locality_get', kwargs={'locality_id': self.city.id})
+
+    def get(self, **headers):
+        return self.client.get(self.url, **headers)
+
+    def test_uncached(self):
+        """Until the data first changes, nothing is cached."""
+        self.assertIsNone(DataVersion.get_current())
+        self.assertEqual('Oakland', self.get().data['name'])
+        self.assertNotIn('ETag', self.get())
+        City.objects.filter(id=self.city.id).update(name='Berkeley')
+        self.assertEqual('Berkeley', self.get().data['name'])
+
+    def test_cached(self):
+        DataVersion.bump()
+        resp = self.get()
+        self.assertEqual('Oakland', json.loads(resp.content)['name'])
+        self.assertEqual('"1"', resp['ETag'])
+        last_modified = resp['Last-Modified']
+
+        # Cached until the data version changes.
+        City.objects.filter(id=self.city.id).update(name='Berkeley')
+        self.assertEqual('Oakland', json.loads(self.get().content)['name'])
+        self.assertEqual(304, self.get(HTTP_IF_NONE_MATCH='"1"').status_code)
+        self.assertEqual(304, self.get(HTTP_IF_MODIFIED_SINCE=last_modified).status_code)
+
+        self.assertEqual(2, DataVersion.bump().version)
+        resp = self.get(HTTP_IF_NONE_MATCH='"1"')
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual('"2"', resp['ETag'])
+        self.assertEqual('Berkeley', json.loads(resp.content)['name'])
+
+    def test_not_modified_only_if_found(self):
+        DataVersion.bump()
+        resp = self.get(HTTP_IF_NONE_MATCH='"1"')
+        self.assertEqual(304, resp.status_code)
+        self.assertIn('Accept', resp['Vary'])
+        self.assertIn('Accept', self.get()['Vary'])
+
+        # A current ETag doesn't stand for a URL that isn't found.
+        self.url = reverse('locality_get', kwargs={'locality_id': 0})
+        resp = self.get(HTTP_IF_NONE_MATCH='"1"')
+        self.assertEqual(404, resp.status_code)
+        self.assertNotIn('ETag', resp)
+
+    def test_admin_changes(self):
+        user = User.objects.create(username='admin')
+        LogEntry.objects.log_action(user.id, None, self.city.id, 'Oakland', CHANGE)
+        self.assertEqual(1, DataVersion.get_current().version)
@@ -10,7 +10,7 @@ class CandidateAdmin(admin.ModelAdmin):
     fields = ('ballot_item', 'first_name', 'middle_name', 'last_name', 'party',
               'photo_url', 'website_url', 'facebook_url', 'twitter_url')
 
-    assert len(models.Candidate._meta.get_fields()) - len(fields) == 4, \
+    assert len(models.Candidate._meta.get_fields()) - len(fields) == 5, \
         "Make sure there are no new fields. %r %r " % \
         (len(fields), len(models.Candidate._meta.get_fields()))
 
@@ -18,4 +18,4 @@ class CandidateAdmin(admin.ModelAdmin):
 admin.site.register(models.Office)
 admin.site.register(models.OfficeElection)
 validate_and_register_admin(
-    models.Candidate, CandidateAdmin, num_hidden_fields=4)
+    models.Candidate, CandidateAdmin, num_hidden_fields=5)
@@ -11,4 +11,4 @@ class ReferendumAdmin(admin.ModelAdmin):
               'website_url', 'facebook_url', 'twitter_url')
 
 validate_and_register_admin(
-    models.Referendum, ReferendumAdmin, num_hidden_fields=5)
+    models.Referendum, ReferendumAdmin, num_hidden_fields=6)
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def set_concrete_types(apps, app_label, base_name, subclass_names):
+    """Sets concrete_type on existing rows (the first matching subclass wins)."""
+    base = apps.get_model(app_label, base_name)
+    for subclass_name in reversed(subclass_names):
+        subclass = apps.get_model(app_label, subclass_name)
+        base.objects.filter(pk__in=subclass.objects.values('pk')) \
+            .update(concrete_type=subclass_name.lower())
+    base.objects.filter(concrete_type=None).update(concrete_type=base_name.lower())
+
+
+def backfill_concrete_types(apps, schema_editor):
+    set_concrete_types(apps, 'ballot', 'BallotItem', ('OfficeElection', 'Referendum'))
+    set_concrete_types(apps, 'ballot', 'BallotItemSelection', ('Candidate', 'ReferendumSelection'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ballot', '0002_auto_20160304_2151'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ballotitem',
+            name='concrete_type',
+            field=models.CharField(default=None, editable=False, max_length=64, blank=True, help_text='Model name of the concrete subclass (none if unknown)', null=True),
+        ),
+        migrations.AddField(
+            model_name='ballotitemselection',
+            name='concrete_type',
+            field=models.CharField(default=None, editable=False, max_length=64, blank=True, help_text='Model name of the concrete subclass (none if unknown)', null=True),
+        ),
+        migrations.RunPython(backfill_concrete_types, migrations.RunPython.noop),
+    ]
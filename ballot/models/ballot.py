@@ -7,7 +7,8 @@ http://votinginfoproject.github.io/vip-specification/
 from django.db import models
 from django.utils.encoding import python_2_unicode_compatible
 
-from locality.models import ReverseLookupStringMixin
+from locality.models import (ConcreteTypeMixin, ReverseLookupStringMixin,
+                             reverse_lookup_all)
 
 
 @python_2_unicode_compatible
@@ -29,6 +30,20 @@ class Ballot(models.Model):
             locality=locality)
         return ballot
 
+    def get_ballot_items(self):
+        """
+        The ballot's items, each with its concrete item (and all that
+        its name shows) fetched already.
+
+        Takes a fixed number of queries, however many items; concrete
+        items (and their offices' localities) are looked up together.
+        """
+        items = list(self.ballot_items.all())
+        concrete_items = [item for item in reverse_lookup_all(items) if item is not None]
+        reverse_lookup_all([item.office.locality for item in concrete_items
+                            if hasattr(item, 'office')])
+        return items
+
     def __str__(self):
         return '%s election for %s' % (
             str(self.date), str(self.locality))
@@ -38,7 +53,7 @@ class Ballot(models.Model):
 
 
 @python_2_unicode_compatible
-class BallotItem(models.Model, ReverseLookupStringMixin):
+class BallotItem(ConcreteTypeMixin, ReverseLookupStringMixin):
     """
     A single referendum or candidate office which appears on a voter's Ballot.
     """
@@ -61,7 +76,7 @@ class BallotItem(models.Model, ReverseLookupStringMixin):
 
 
 @python_2_unicode_compatible
-class BallotItemSelection(models.Model, ReverseLookupStringMixin):
+class BallotItemSelection(ConcreteTypeMixin, ReverseLookupStringMixin):
     """
     YES/NO to a referendum, or a candidate.
 
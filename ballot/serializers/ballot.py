@@ -12,7 +12,8 @@ class BallotItemSerializer(ExtendedModelSerializer):
 
 
 class BallotSerializer(ExtendedModelSerializer):
-    ballot_items = BallotItemSerializer(many=True, read_only=True, exclude=['ballot'])
+    ballot_items = BallotItemSerializer(many=True, read_only=True, exclude=['ballot'],
+                                        source='get_ballot_items')
 
     class Meta:
         model = Ballot
@@ -1,8 +1,37 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
-from ballot.models import Ballot
+from ballot.models import Ballot, BallotItem
+from ballot.serializers import BallotSerializer
+from ballot.tests.factory import BallotFactory, OfficeElectionFactory, ReferendumFactory
 
 
 class ObjectCreateTest(TestCase):
     def test_create_empty(self):
         ballot = Ballot()  # noqa
+
+
+class BallotItemsTest(TestCase):
+    def add_items(self, ballot, num_items):
+        for _ in range(num_items):
+            OfficeElectionFactory(ballot=ballot)
+            ReferendumFactory(ballot=ballot)
+
+    def test_serializer_queries(self):
+        ballot = BallotFactory()
+        self.add_items(ballot, 1)
+        with CaptureQueriesContext(connection) as few:
+            BallotSerializer(Ballot.objects.get(id=ballot.id)).data
+
+        self.add_items(ballot, 10)
+        with self.assertNumQueries(len(few.captured_queries)):
+            data = BallotSerializer(Ballot.objects.get(id=ballot.id)).data
+
+        self.assertEqual(
+            sorted([unicode(item) for item in BallotItem.objects.filter(ballot=ballot)]),
+            sorted([item['name'] for item in data['ballot_items']]))
+        self.assertEqual(set(['Office', 'Referendum']),
+                         set([item['contest_type'] for item in data['ballot_items']]))
+        self.assertEqual(set(['id', 'contest_type', 'name']),
+                         set([key for item in data['ballot_items'] for key in item]))
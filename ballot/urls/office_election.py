@@ -1,13 +1,14 @@
 from django.conf.urls import patterns, url
 
 from .. import views
+from _django_utils.cache import cache_response
 
 
 urlpatterns = patterns(
     '',
     url(r'office_election/(?P<office_election_id>[0-9]+)$',
-        views.OfficeElectionViewSet.as_view(actions={'get': 'retrieve'}),
+        cache_response(views.OfficeElectionViewSet.as_view(actions={'get': 'retrieve'})),
         name='office_election_get'),
     url(r'candidate/(?P<candidate_id>[0-9]+)$',
-        views.CandidateViewSet.as_view(actions={'get': 'retrieve'}),
+        cache_response(views.CandidateViewSet.as_view(actions={'get': 'retrieve'})),
         name='candidate_get'))
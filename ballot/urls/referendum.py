@@ -1,10 +1,11 @@
 from django.conf.urls import patterns, url
 
 from .. import views
+from _django_utils.cache import cache_response
 
 
 urlpatterns = patterns(
     '',
     url(r'referendum/(?P<referendum_id>[0-9]+)$',
-        views.ReferendumViewSet.as_view(actions={'get': 'retrieve'}),
+        cache_response(views.ReferendumViewSet.as_view(actions={'get': 'retrieve'})),
         name='referendum_get'))
@@ -114,6 +114,16 @@ DATABASES = {
 
 DATABASE_ROUTERS = ['disclosure.routers.DisclosureRouter']
 
+# API responses are cached until the data changes (see _django_utils.cache).
+# With many server processes, use a shared backend (e.g. file-based or
+# memcached) in settings_local.py.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'TIMEOUT': 24 * 60 * 60,
+    },
+}
+
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
 USE_I18N = True
@@ -4,6 +4,7 @@ from django.conf.urls.static import static
 from django.contrib import admin
 
 from . import views
+from _django_utils.cache import cache_response
 
 admin.autodiscover()
 
@@ -27,25 +28,25 @@ urlpatterns = patterns(
     # API views
     url(r'^docs/', include('rest_framework_swagger.urls')),
 
-    url(r'^locality/search/', views.search_view,
+    url(r'^locality/search/', cache_response(views.search_view),
         name='search'),
 
     url(r'^ballot/(?P<ballot_id>[0-9]+)/disclosure_summary$',
-        views.locality_disclosure_summary_view,
+        cache_response(views.locality_disclosure_summary_view),
         name='locality_disclosure_summary'),
 
     url(r'referendum/(?P<referendum_id>[0-9]+)/supporting$',
-        views.ReferendumViewSet.as_view(actions={'get': 'supporting'}),
+        cache_response(views.ReferendumViewSet.as_view(actions={'get': 'supporting'})),
         name='referendum_supporting'),
     url(r'referendum/(?P<referendum_id>[0-9]+)/opposing$',
-        views.ReferendumViewSet.as_view(actions={'get': 'opposing'}),
+        cache_response(views.ReferendumViewSet.as_view(actions={'get': 'opposing'})),
         name='referendum_opposing'),
 
     url(r'candidate/(?P<candidate_id>[0-9]+)/supporting',
-        views.CandidateViewSet.as_view(actions={'get': 'supporting'}),
+        cache_response(views.CandidateViewSet.as_view(actions={'get': 'supporting'})),
         name='candidate_supporting'),
     url(r'candidate/(?P<candidate_id>[0-9]+)/opposing$',
-        views.CandidateViewSet.as_view(actions={'get': 'opposing'}),
+        cache_response(views.CandidateViewSet.as_view(actions={'get': 'opposing'})),
         name='candidate_opposing'))
 
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -11,8 +11,8 @@ from rest_framework.response import Response
 
 from .serializers import BeneficiaryMoneyReceivedSerializer
 from ballot.models import Ballot, BallotItemSelection, ReferendumSelection
-from finance.models import Beneficiary, IndependentMoney
-from finance.views import summarize_money
+from finance.models import Beneficiary
+from finance.summaries import get_ballot_summary
 from locality.models import Locality
 from locality.serializers import LocalitySerializer
 from swagger_nickname_registry import swagger_nickname
@@ -55,13 +55,8 @@ def locality_disclosure_summary_view(request, ballot_id):
     """
     # TODO: set up ElectionDay app.
     ballot = get_object_or_404(Ballot, id=ballot_id)
-    locality = Locality.objects.get(id=ballot.locality_id).reverse_lookup()
 
-    # Get all relevant rows of IndependentMoney
-    benefits = IndependentMoney.objects.filter(
-        beneficiary__ballot_item_selection__ballot_item__ballot=ballot)
-
-    data_dict = summarize_money(locality=locality, benefits=benefits)
+    data_dict = get_ballot_summary(ballot)
     data_dict['location']['next_election_date'] = ballot.date if ballot else None
 
     return Response(data_dict)
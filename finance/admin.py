@@ -34,16 +34,25 @@ class IndependentMoneyAdmin(admin.ModelAdmin):
                        'amount', 'cumulative_amount', 'report_date',
                        'source', 'source_xact_id')
 
+
+class LoadErrorAdmin(admin.ModelAdmin):
+    list_display = ('source_xact_id', 'form_type', 'agency', 'error_type', 'created')
+    list_filter = ('form_type', 'agency', 'error_type')
+    readonly_fields = ('source', 'source_xact_id', 'form_type', 'agency',
+                       'error_type', 'message', 'row', 'created')
+
 admin.site.register(models.Committee)
 admin.site.register(models.Employer)
 
 validate_and_register_admin(
-    models.Beneficiary, BeneficiaryAdmin, num_hidden_fields=5)
+    models.Beneficiary, BeneficiaryAdmin, num_hidden_fields=6)
 validate_and_register_admin(
-    models.PersonBenefactor, PersonBenefactorAdmin, num_hidden_fields=5)
+    models.PersonBenefactor, PersonBenefactorAdmin, num_hidden_fields=6)
 validate_and_register_admin(
-    models.OtherBenefactor, OtherBenefactorAdmin, num_hidden_fields=6)
+    models.OtherBenefactor, OtherBenefactorAdmin, num_hidden_fields=7)
 validate_and_register_admin(
-    models.CommitteeBenefactor, CommitteeBenefactorAdmin, num_hidden_fields=9)
+    models.CommitteeBenefactor, CommitteeBenefactorAdmin, num_hidden_fields=10)
 validate_and_register_admin(
     models.IndependentMoney, IndependentMoneyAdmin, num_hidden_fields=2)
+validate_and_register_admin(
+    models.LoadError, LoadErrorAdmin, num_hidden_fields=1)
@@ -0,0 +1,171 @@
+"""
+Times the IndependentMoney lookups that loads and views make, on a
+scratch table of synthetic rows: first with only the foreign key
+indexes, then with the indexes declared on the model.
+"""
+import datetime
+import random
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from finance.models import IndependentMoney
+
+SCRATCH_TABLE = 'benchmark_independentmoney'
+
+custom_options = (
+    make_option(
+        "--rows",
+        action="store",
+        dest="rows",
+        type="int",
+        default=2000000,
+        help="Number of synthetic rows"
+    ),
+    make_option(
+        "--lookups",
+        action="store",
+        dest="lookups",
+        type="int",
+        default=100,
+        help="Number of times to time each lookup"
+    ),
+    make_option(
+        "--beneficiaries",
+        action="store",
+        dest="beneficiaries",
+        type="int",
+        default=500,
+        help="Number of distinct beneficiaries (and 20x benefactors)"
+    ),
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark IndependentMoney lookups, before and after its indexes'
+    option_list = BaseCommand.option_list + custom_options
+
+    # Each lookup, as (name, SQL, function giving its parameters).
+    LOOKUPS = (
+        ('by transaction (x100)',
+         'SELECT source_xact_id FROM {table} '
+         'WHERE source = %s AND source_xact_id IN ({xacts})',
+         lambda self: ['NF'] + [self.xact_id(random.randrange(self.rows))
+                                for _ in range(100)]),
+        ('by beneficiary, latest 100',
+         'SELECT id FROM {table} WHERE beneficiary_id = %s '
+         'ORDER BY report_date DESC, id DESC LIMIT 100',
+         lambda self: [random.randrange(self.beneficiaries)]),
+        ('by benefactor, total',
+         'SELECT SUM(amount) FROM {table} WHERE benefactor_id = %s',
+         lambda self: [random.randrange(self.benefactors)]),
+    )
+
+    def handle(self, *args, **options):
+        self.rows = options['rows']
+        self.beneficiaries = options['beneficiaries']
+        self.benefactors = 20 * options['beneficiaries']
+        self.verbosity = int(options['verbosity'])
+        self.quote = connection.ops.quote_name
+
+        try:
+            self.create_table()
+            before = self.time_lookups(options['lookups'])
+            self.create_model_indexes()
+            after = self.time_lookups(options['lookups'])
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('DROP TABLE IF EXISTS %s' % self.quote(SCRATCH_TABLE))
+
+        self.stdout.write('%-30s %12s %12s' % ('lookup (ms each)', 'before', 'after'))
+        for name, _, _ in self.LOOKUPS:
+            self.stdout.write('%-30s %12.3f %12.3f' % (
+                name, 1000 * before[name], 1000 * after[name]))
+
+    @staticmethod
+    def xact_id(row_num):
+        return 'xact%012d' % row_num
+
+    def create_index(self, cursor, columns, unique=False):
+        cursor.execute('CREATE %sINDEX %s ON %s (%s)' % (
+            'UNIQUE ' if unique else '',
+            self.quote('%s_%s' % (SCRATCH_TABLE, '_'.join(columns))),
+            self.quote(SCRATCH_TABLE),
+            ', '.join([self.quote(column) for column in columns])))
+
+    def analyze(self, cursor):
+        """Updates the table statistics, for the query planner."""
+        if connection.vendor == 'mysql':
+            cursor.execute('ANALYZE TABLE %s' % self.quote(SCRATCH_TABLE))
+            cursor.fetchall()  # (a status row)
+        else:
+            cursor.execute('ANALYZE %s' % self.quote(SCRATCH_TABLE))
+
+    @transaction.atomic
+    def create_table(self):
+        """The IndependentMoney columns that lookups use; its FK indexes only."""
+        if self.verbosity:
+            self.stdout.write('Creating %d synthetic rows...' % self.rows)
+        start_date = datetime.date(2010, 1, 1)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TABLE %s (id integer PRIMARY KEY, amount double precision, '
+                'report_date date, benefactor_id integer, beneficiary_id integer, '
+                'source varchar(2), source_xact_id varchar(32))' % (
+                    self.quote(SCRATCH_TABLE)))
+
+            insert_sql = 'INSERT INTO %s VALUES (%%s, %%s, %%s, %%s, %%s, %%s, %%s)' % (
+                self.quote(SCRATCH_TABLE))
+            batch_size = 10000
+            for first_row in range(0, self.rows, batch_size):
+                cursor.executemany(insert_sql, [
+                    (row_num, float(random.randrange(1, 100000)) / 100,
+                     start_date + datetime.timedelta(days=random.randrange(3650)),
+                     random.randrange(self.benefactors),
+                     random.randrange(self.beneficiaries),
+                     'NF', self.xact_id(row_num))
+                    for row_num in range(first_row, min(first_row + batch_size, self.rows))])
+
+            for column in ('benefactor_id', 'beneficiary_id'):
+                self.create_index(cursor, [column])
+            self.analyze(cursor)
+
+    @transaction.atomic
+    def create_model_indexes(self):
+        """Adds the indexes that IndependentMoney declares."""
+        def columns(field_names):
+            return [IndependentMoney._meta.get_field(field_name).column
+                    for field_name in field_names]
+
+        if self.verbosity:
+            self.stdout.write('Adding the model indexes...')
+        meta = IndependentMoney._meta
+        with connection.cursor() as cursor:
+            for field_names in meta.unique_together:
+                self.create_index(cursor, columns(field_names), unique=True)
+            for field_names in meta.index_together:
+                self.create_index(cursor, columns(field_names))
+            for field in meta.local_fields:
+                if field.db_index and not field.primary_key and not field.rel:
+                    self.create_index(cursor, [field.column])
+            self.analyze(cursor)
+
+    def time_lookups(self, num_lookups):
+        """The mean seconds each lookup takes."""
+        times = dict()
+        with connection.cursor() as cursor:
+            for name, sql, get_params in self.LOOKUPS:
+                elapsed = 0.
+                for _ in range(num_lookups):
+                    params = get_params(self)
+                    query = sql.format(table=self.quote(SCRATCH_TABLE),
+                                       xacts=', '.join(['%s'] * (len(params) - 1)))
+                    start = time.time()
+                    cursor.execute(query, params)
+                    cursor.fetchall()
+                    elapsed += time.time() - start
+                times[name] = elapsed / num_lookups
+        return times
@@ -0,0 +1,175 @@
+"""
+Suggests duplicate benefactors, employers and cities (as a CSV, best
+first), and applies reviewed suggestions in bulk.
+
+Records are grouped into clusters of similar names; the first
+(oldest) record of each cluster is suggested as the true model for
+the others. To apply, delete the rows you disagree with (or change
+their true_id), then pass the file to --apply.
+"""
+import csv
+import sys
+from collections import defaultdict
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ... import models
+from generic_dedupe import CanonicalIdMap, DedupeMixin
+from generic_dedupe.candidates import DuplicateFinder, normalize
+from generic_dedupe.signals import move_back, move_related
+from locality.models import City
+
+CSV_COLUMNS = ('model', 'cluster', 'score', 'true_id', 'id', 'name')
+
+custom_options = (
+    make_option(
+        "--models",
+        action="store",
+        dest="models",
+        default=None,
+        help="Comma-separated models to search (default: all)"
+    ),
+    make_option(
+        "--threshold",
+        action="store",
+        dest="threshold",
+        type="float",
+        default=0.7,
+        help="Minimum name similarity (0-1) of duplicates"
+    ),
+    make_option(
+        "--output",
+        action="store",
+        dest="output",
+        default=None,
+        help="CSV file to write suggestions to (default: stdout)"
+    ),
+    make_option(
+        "--apply",
+        action="store",
+        dest="apply",
+        default=None,
+        help="CSV file of (reviewed) suggestions to apply"
+    ),
+)
+
+
+def person_records():
+    for pk, first, middle, last, zip_code_id in models.PersonBenefactor.objects \
+            .order_by('pk') \
+            .values_list('pk', 'first_name', 'middle_name', 'last_name', 'zip_code_id') \
+            .iterator():
+        name = ' '.join([part for part in (first, middle, last) if part])
+        keys = [(normalize(last), zip_code_id)] if zip_code_id else []
+        yield pk, name, keys, None
+
+
+def name_records(model):
+    def records():
+        for pk, name in model.objects.order_by('pk').values_list('pk', 'name').iterator():
+            yield pk, name, [], None
+    return records
+
+
+def city_records():
+    for pk, name, state_id in City.filtered_objects \
+            .order_by('pk') \
+            .values_list('pk', 'name', 'state_id') \
+            .iterator():
+        yield pk, name, [(state_id, normalize(name))], state_id
+
+
+# Searched models, with their records as (pk, name, blocking keys, group).
+MODEL_RECORDS = (
+    ('PersonBenefactor', models.PersonBenefactor, person_records),
+    ('OtherBenefactor', models.OtherBenefactor, name_records(models.OtherBenefactor)),
+    ('Employer', models.Employer, name_records(models.Employer)),
+    ('City', City, city_records),
+)
+
+
+class Command(BaseCommand):
+    help = 'Suggest duplicate benefactors, employers and cities, or apply suggestions'
+    option_list = BaseCommand.option_list + custom_options
+
+    def handle(self, *args, **options):
+        self.verbosity = int(options['verbosity'])
+        model_records = MODEL_RECORDS
+        if options['models']:
+            names = options['models'].split(',')
+            unknown = set(names) - set([name for name, _, _ in MODEL_RECORDS])
+            if unknown:
+                raise CommandError("Unknown models: %s" % ', '.join(sorted(unknown)))
+            model_records = [spec for spec in MODEL_RECORDS if spec[0] in names]
+
+        if options['apply']:
+            with open(options['apply']) as fp:
+                self.apply(csv.DictReader(fp), model_records)
+            return
+
+        fp = open(options['output'], 'w') if options['output'] else self.stdout
+        try:
+            writer = csv.writer(fp)
+            writer.writerow(CSV_COLUMNS)
+            for name, model, records in model_records:
+                writer.writerows(self.suggest(name, model, records, options['threshold']))
+        finally:
+            if options['output']:
+                fp.close()
+
+    def suggest(self, name, model, records, threshold):
+        """The CSV rows for a model's clusters, best first."""
+        finder = DuplicateFinder(threshold=threshold)
+        names = dict()
+        for pk, record_name, keys, group in records():
+            finder.add(pk, record_name, keys=keys, group=group)
+            names[pk] = record_name
+        clusters = finder.find()
+        if self.verbosity > 1:
+            sys.stderr.write("%s: %d clusters (%d records; %d blocks skipped)\n" % (
+                name, len(clusters), len(names), finder.num_skipped_blocks))
+
+        rows = []
+        for cluster_num, (score, pks) in enumerate(clusters, 1):
+            for pk in pks:
+                rows.append((name, cluster_num, '%.3f' % score, pks[0], pk,
+                             (names[pk] or '').encode('utf-8')))
+        return rows
+
+    @transaction.atomic
+    def apply(self, rows, model_records):
+        """Sets the true models of the suggested duplicates."""
+        models_by_name = dict([(name, model) for name, model, _ in model_records])
+        duplicate_ids = defaultdict(lambda: defaultdict(list))
+        for row in rows:
+            if row['model'] in models_by_name and row['id'] != row['true_id']:
+                duplicate_ids[row['model']][int(row['true_id'])].append(int(row['id']))
+
+        for name, ids_by_true_id in duplicate_ids.items():
+            model = models_by_name[name]
+            if not issubclass(model, DedupeMixin):
+                self.stderr.write("%s can't be deduped; skipping %d suggestions." % (
+                    name, sum([len(ids) for ids in ids_by_true_id.values()])))
+                continue
+
+            canonical_ids = CanonicalIdMap(model)
+            for true_id, ids in ids_by_true_id.items():
+                true_id = canonical_ids.get_canonical_id(true_id)
+                # (Rows deduped before are first reverted, as saving each would.)
+                saved_true_ids = dict(model._base_manager
+                                      .filter(pk__in=[pk for pk in ids if pk != true_id])
+                                      .values_list('pk', 'true_model_id'))
+                ids = sorted([pk for pk, saved_true_id in saved_true_ids.items()
+                              if saved_true_id != true_id])
+                for pk in ids:
+                    if saved_true_ids[pk] is not None:
+                        move_back(model, pk, saved_true_ids[pk])
+                model._base_manager.filter(pk__in=ids).update(true_model_id=true_id)
+                if not getattr(settings, 'DEDUPE_IN_BACKGROUND', False):
+                    for pk in ids:  # (as saving each would)
+                        move_related(model, pk, true_id)
+                if self.verbosity:
+                    self.stdout.write("Deduped %d %s into %d." % (len(ids), name, true_id))
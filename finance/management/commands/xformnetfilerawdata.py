@@ -4,10 +4,16 @@ Command to download and load California campaign finance data from Netfile.
 See https://netfile.com/Filer/Content/docs/cal_format_201.pdf for documentation.
 """
 
+import json
 import warnings
 import logging
+import multiprocessing
+import re
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
 from dateutil.parser import parse as date_parse
-from itertools import izip_longest
+from itertools import izip_longest, product
 from numbers import Number
 from optparse import make_option
 
@@ -15,12 +21,17 @@ import numpy as np
 import pandas as pd
 
 from django.core.management.base import CommandError
-from django.db import transaction
+from django.db import DatabaseError, connection, connections, transaction
+from django.db.models import Max
+from django.utils.encoding import force_text
 
 from ... import models
-from ballot.models import Ballot
+from ...summaries import refresh_money_summaries
+from _django_utils.models import DataVersion
+from ballot.models import Ballot, BallotItemSelection
 from ballot.models import Candidate, Office, OfficeElection, Party
 from ballot.models import Referendum, ReferendumSelection
+from generic_dedupe import CanonicalIdMap, DedupeMixin
 from locality.models import City, State, ZipCode
 from netfile_raw.management.commands import downloadnetfilerawdata
 
@@ -38,6 +49,284 @@ def isnone(val):
     return val is None or val == 'None'
 
 
+class DimensionCache(object):
+    """
+    Caches dimension rows (State, City, ZipCode, Employer, Party) for
+    the length of a load run, keyed on their cleaned natural keys.
+    Also caches each filer's ballot item selection (see parse_ballot_info).
+
+    Only a few thousand distinct values exist, so this saves
+    a get_or_create round trip for nearly every row.
+    """
+    def __init__(self):
+        self.hits = Counter()
+        self.misses = Counter()
+        self._objects = dict()
+        self._new_keys = []
+        self._canonical_ids = dict()
+
+    def get_or_create(self, model, **kwargs):
+        return self.get_or_compute(
+            model, sorted([(k, getattr(v, 'pk', v)) for k, v in kwargs.items()]),
+            lambda: find_or_create(
+                model, canonical_ids=self.get_canonical_ids(model), **kwargs))
+
+    def get_canonical_ids(self, model):
+        """The run's CanonicalIdMap for a deduped model (else None)."""
+        if not issubclass(model, DedupeMixin):
+            return None
+        if model not in self._canonical_ids:
+            self._canonical_ids[model] = CanonicalIdMap(model)
+        return self._canonical_ids[model]
+
+    def get_or_compute(self, model, key, compute):
+        """The model instance for key, from compute() the first time."""
+        key = (model,) + tuple(key)
+        obj = self._objects.get(key)
+        if obj is not None:
+            self.hits[model.__name__] += 1
+            return obj
+
+        self.misses[model.__name__] += 1
+        obj = compute()
+        self._objects[key] = obj
+        self._new_keys.append(key)
+        return obj
+
+    @contextmanager
+    def discard_on_error(self):
+        """
+        Forget any lookups made in the block if it raises.
+
+        The block is expected to be atomic: on error, rows created
+        within it have been rolled back and must not be reused.
+        """
+        mark = len(self._new_keys)
+        try:
+            yield
+        except Exception:
+            for key in self._new_keys[mark:]:
+                self._objects.pop(key, None)
+            del self._new_keys[mark:]
+            raise
+
+    def get_new_entries(self, mark=0):
+        """
+        The (key, object) pairs first looked up after mark (a count of
+        lookups, from num_new_entries()), e.g. for another process's cache.
+        """
+        return [(key, self._objects[key]) for key in self._new_keys[mark:]
+                if key in self._objects]
+
+    def num_new_entries(self):
+        return len(self._new_keys)
+
+    def add_entries(self, entries):
+        """Adds (key, object) pairs from get_new_entries, keeping any it has."""
+        for key, obj in entries:
+            if key not in self._objects:
+                self._objects[key] = obj
+                self._new_keys.append(key)
+
+    def summary(self):
+        lines = ["Lookup cache: %d hits, %d misses" % (
+            sum(self.hits.values()), sum(self.misses.values()))]
+        for name in sorted(set(self.hits) | set(self.misses)):
+            lines.append("    %s: %d hits, %d misses" % (
+                name, self.hits[name], self.misses[name]))
+        return '\n'.join(lines)
+
+
+class QueryCounter(deque):
+    """A connection's queries_log that also counts all queries logged."""
+    count = 0
+
+    def append(self, query):
+        self.count += 1
+        deque.append(self, query)
+
+
+class LoadProfile(object):
+    """
+    Wall time and query count of each stage of a load run (read, clean,
+    benefactor, beneficiary, ballot, money), per form type and agency;
+    see --profile.
+
+    Time and queries of a stage nested in another count only once,
+    towards the inner stage.
+    """
+    def __init__(self):
+        self.form_type = None
+        self.stats = defaultdict(Counter)  # (form type, agency, stage) => stats
+        self.errors = Counter()  # (form type, agency) => number of error rows
+        self._nested = []
+
+    def start(self):
+        """Starts counting the (default) connection's queries."""
+        self._logging = (connection.queries_log, connection.force_debug_cursor)
+        connection.queries_log = QueryCounter(maxlen=connection.queries_limit)
+        connection.force_debug_cursor = True
+
+    def stop(self):
+        connection.queries_log, connection.force_debug_cursor = self._logging
+
+    @contextmanager
+    def stage(self, name, agency=None):
+        key = (self.form_type, agency and agency['shortcut'], name)
+        start_time, start_queries = time.time(), connection.queries_log.count
+        self._nested.append(Counter())
+        try:
+            yield
+        finally:
+            nested = self._nested.pop()
+            seconds = time.time() - start_time
+            queries = connection.queries_log.count - start_queries
+            self.stats[key].update(seconds=seconds - nested['seconds'],
+                                   queries=queries - nested['queries'], calls=1)
+            if self._nested:
+                self._nested[-1].update(seconds=seconds, queries=queries)
+
+    def add_errors(self, error_rows):
+        for _, raw_row, _, _ in error_rows:
+            self.errors[(self.form_type, raw_row.get('agency_shortcut'))] += 1
+
+    def merge(self, stats, errors):
+        """Adds the stats and errors of another profile (of a worker)."""
+        for key, stat in stats.items():
+            self.stats[key].update(stat)
+        self.errors.update(errors)
+
+    def report(self):
+        """The profile as a (JSON-serializable) dict."""
+        return {
+            'stages': [dict(stat, form_type=form_type, agency=agency, stage=stage)
+                       for (form_type, agency, stage), stat in sorted(self.stats.items())],
+            'errors': [{'form_type': form_type, 'agency': agency, 'count': count}
+                       for (form_type, agency), count in sorted(self.errors.items())],
+        }
+
+    def summary(self):
+        lines = ["Load profile: %.1fs, %d queries, %d errors" % (
+            sum([stat['seconds'] for stat in self.stats.values()]),
+            sum([stat['queries'] for stat in self.stats.values()]),
+            sum(self.errors.values()))]
+        for ki, title in enumerate(('form type', 'agency', 'stage')):
+            totals = defaultdict(Counter)
+            for key, stat in self.stats.items():
+                totals[key[ki]].update(stat)
+            lines.append("    By %s:" % title)
+            for name, stat in sorted(totals.items(),
+                                     key=lambda item: -item[1]['seconds']):
+                lines.append("        %-20s %10.1fs %10d queries %10d calls" % (
+                    name or '(all)', stat['seconds'], stat['queries'], stat['calls']))
+        return '\n'.join(lines)
+
+
+class NoProfile(object):
+    """Stands in for LoadProfile.stage when not profiling."""
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class LoadErrorLog(object):
+    """
+    Saves error rows as LoadErrors, batch_size at a time, keeping only
+    the loader columns of each row.
+    """
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self.num_errors = 0
+        self._pending = []
+
+    def add(self, error_rows):
+        """Logs (ri, raw_row, minimal_row, exception) error rows."""
+        if _profile is not None:
+            _profile.add_errors(error_rows)
+        for _, _, minimal_row, ex in error_rows:
+            self._pending.append(models.LoadError(
+                source='NF',
+                source_xact_id=minimal_row.get('netFileKey', ''),  # (blank if missing)
+                form_type=minimal_row.get('form_Type', ''),
+                agency=minimal_row.get('agency_shortcut'),
+                error_type=type(ex).__name__,
+                message=force_text(ex, errors='replace'),
+                row=json.dumps(dict([(col, val) for col, val in minimal_row.items()
+                                     if col in LOADER_COLUMNS]), default=str)))
+        self.num_errors += len(error_rows)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        models.LoadError.objects.bulk_create(self._pending)
+        self._pending = []
+
+
+def clear_load_errors(last_id, batch_size=500):
+    """
+    Deletes the LoadErrors (up to last_id, from earlier runs) of rows
+    that have loaded since, or that failed again.
+    """
+    earlier_errors = models.LoadError.objects.filter(id__lte=last_id, source='NF')
+    loaded = models.IndependentMoney.objects.filter(source='NF').values('source_xact_id')
+    earlier_errors.filter(source_xact_id__in=loaded).delete()
+
+    # MySQL can't delete from a table it selects from, so the rows that
+    # failed again are read first, batch_size at a time.
+    after_id = last_id
+    while True:
+        new_errors = list(models.LoadError.objects
+                          .filter(id__gt=after_id)
+                          .order_by('id')
+                          .values_list('id', 'source_xact_id')[:batch_size])
+        if not new_errors:
+            break
+        earlier_errors.filter(source_xact_id__in=[xact_id for _, xact_id in new_errors]) \
+            .delete()
+        after_id = new_errors[-1][0]
+
+
+# The LoadProfile of a --profile run; inherited by pool workers.
+_profile = None
+
+
+def profiled(stage, agency=None):
+    """Times the block as a stage of the load run (if profiling)."""
+    if _profile is None:
+        return NoProfile()
+    return _profile.stage(stage, agency=agency)
+
+
+def profiled_iter(stage, iterable):
+    """Iterates, timing each step as a stage of the load run (if profiling)."""
+    iterator = iter(iterable)
+    while True:
+        with profiled(stage):
+            item = next(iterator, StopIteration)
+        if item is StopIteration:
+            return
+        yield item
+
+
+def find_or_create(model, canonical_ids=None, **kwargs):
+    """
+    model.objects.get_or_create; deduped models resolve to their true
+    models, so new rows never point at a duplicate.
+    """
+    if issubclass(model, DedupeMixin):
+        return (canonical_ids or CanonicalIdMap(model)).get_or_create(**kwargs)[0]
+    return model.objects.get_or_create(**kwargs)[0]
+
+
+def get_or_create(model, cache=None, **kwargs):
+    """find_or_create, through the lookup cache (if any)."""
+    if cache is None:
+        return find_or_create(model, **kwargs)
+    return cache.get_or_create(model, **kwargs)
+
+
 def clean_name(str):
     """BEN CIP => Ben Cip"""
     if str is None or str == '':
@@ -77,43 +366,111 @@ def clean_zip(zip_code):
     return zip_code
 
 
-def parse_benefactor(row, verbosity=1):
-    # Benefactor info
-    bf_state, _ = State.objects.get_or_create(
-        short_name=clean_state(row.get('tran_ST')) or 'Unknown-State')
-    bf_city, _ = City.objects.get_or_create(
-        name=clean_city(row.get('tran_City')) or 'Unknown-City',
+def clean_name_column(col):
+    """Vectorized clean_name, over a Series of strings."""
+    return (col.str.strip().str.lower()
+            .str.replace(' +', ' ')
+            .str.replace('(^| )(.)', lambda m: m.group(1) + m.group(2).upper()))
+
+
+def clean_city_column(col):
+    """Vectorized clean_city, over a Series of strings."""
+    return clean_name_column(col.str.split(',').str[0])
+
+
+def clean_state_column(col):
+    """Vectorized clean_state (without the warnings)."""
+    return col.str.strip().str.upper()
+
+
+def clean_zip_column(col):
+    """Vectorized clean_zip (without the warnings)."""
+    col = col.str.strip().str.upper()
+    col = col.str.split(',').str[0].str.strip()
+    return col.str.split('-').str[0].str.strip()
+
+
+CLEAN_COLUMNS = (
+    ('tran_ST', clean_state_column),
+    ('tran_City', clean_city_column),
+    ('tran_Zip4', clean_zip_column),
+    ('tran_Emp', clean_name_column),
+    ('tran_NamF', clean_name_column),
+    ('tran_NamL', clean_name_column),
+    ('tran_Occ', clean_name_column),
+    ('filerName', clean_name_column),
+    ('cand_NamL', clean_name_column),
+)
+
+
+def clean_form_data(data):
+    """
+    Cleans the name, city, state and zip columns over the whole DataFrame,
+    rather than row by row.
+
+    Each value (but missing ones) becomes what the matching clean_*
+    function would make of it; the row parsers take rows cleaned
+    this way, and don't clean them again.
+    """
+    data = data.copy()
+    for col, clean_column in CLEAN_COLUMNS:
+        if col not in data:
+            continue
+        raw = data[col].map(
+            lambda val: val if isnone(val) or isnan(val) or isinstance(val, basestring)
+            else str(val)).astype(object)  # (e.g. zip codes read as numbers)
+        keep = raw.notnull() & (raw != 'None')
+        data[col] = clean_column(raw).where(keep, data[col])
+    return data
+
+
+def parse_location(row, cache=None):
+    """Returns the benefactor's (state, city, zip code), from a cleaned row."""
+    bf_state = get_or_create(
+        State, cache=cache,
+        short_name=row.get('tran_ST') or 'Unknown-State')
+    bf_city = get_or_create(
+        City, cache=cache,
+        name=row.get('tran_City') or 'Unknown-City',
         state=bf_state)
-    bf_zip_code, _ = ZipCode.objects.get_or_create(
-        short_name=clean_zip(str(row.get('tran_Zip4') or '')) or 'Unknown-Zip',
+    bf_zip_code = get_or_create(
+        ZipCode, cache=cache,
+        short_name=row.get('tran_Zip4') or 'Unknown-Zip',
         state=bf_state)
+    return bf_state, bf_city, bf_zip_code
+
+
+def parse_benefactor(row, verbosity=1, cache=None):
+    # Benefactor info (row is cleaned; see clean_form_data)
+    bf_state, bf_city, bf_zip_code = parse_location(row, cache=cache)
 
     # Make sure row type is of the known types
     assert row['entity_Cd'] in ('IND', 'OTH', 'SCC', 'COM', 'PTY', 'CRT')
 
     if row['entity_Cd'] == 'IND':  # individual
-        employer_name = clean_name(row.get('tran_Emp'))
+        employer_name = row.get('tran_Emp')
         if employer_name:
-            employer, _ = models.Employer.objects.get_or_create(name=employer_name)
+            employer = get_or_create(
+                models.Employer, cache=cache, name=employer_name)
         else:
             employer = None
-        raw_name = clean_name(row.get('tran_NamF')) or ''
+        raw_name = row.get('tran_NamF') or ''
         first_name = raw_name.split(' ')[0]
         middle_name = raw_name[len(first_name):].strip()
         benefactor, _ = models.PersonBenefactor.objects.get_or_create(
             first_name=first_name, middle_name=middle_name,
-            last_name=clean_name(row.get('tran_NamL')) or '',
+            last_name=row.get('tran_NamL') or '',
             employer=employer,
             city=bf_city,
             state=bf_state,
             zip_code=bf_zip_code,
             benefactor_locality=bf_city)
-        benefactor.occupation = clean_name(row.get('tran_Occ'))  # Not reliable
+        benefactor.occupation = row.get('tran_Occ')  # Not reliable
         benefactor.save()
 
     elif row['entity_Cd'] == 'OTH':  # Commerial benefactor or Other
         benefactor, _ = models.OtherBenefactor.objects \
-            .get_or_create(name=clean_name(row.get('tran_NamL', '')))
+            .get_or_create(name=row.get('tran_NamL', ''))
         benefactor.benefactor_locality = bf_city
         benefactor.save()
 
@@ -135,8 +492,8 @@ def parse_benefactor(row, verbosity=1):
         assert queryset.count() == 1, "Avoid duplicate committees"
 
     elif row['entity_Cd'] in ['PTY']:
-        name = clean_name(row.get('tran_NamL')) or ''
-        party = parse_party_from_name(name)
+        name = row.get('tran_NamL') or ''
+        party = parse_party_from_name(name, cache=cache)
         benefactor, _ = models.PartyBenefactor.objects \
             .get_or_create(name=name, party=party)
 
@@ -149,7 +506,7 @@ def parse_benefactor(row, verbosity=1):
     return benefactor, bf_zip_code
 
 
-def parse_party_from_name(committee_name):
+def parse_party_from_name(committee_name, cache=None):
     known_parties = dict(
         Republican=('Republican',),
         Democrat=('Democrat', 'Democratic'))
@@ -157,45 +514,52 @@ def parse_party_from_name(committee_name):
     # San Diego County Democratic Party
     for key, val in known_parties.items():
         if np.any([s.lower() in committee_name.lower() for s in val]):
-            return Party.objects.get_or_create(name=key)[0]
-    return Party.objects.get_or_create(name='Unknown')[0]
+            return get_or_create(Party, cache=cache, name=key)
+    return get_or_create(Party, cache=cache, name='Unknown')
 
 
-def parse_beneficiary(row, agency, verbosity=1):
-    # Parse and save the beneficiary, contribution.
-    assert agency is not None, "Agency should be set."
-
-    state, _ = State.objects.get_or_create(short_name='CA')
+def parse_agency_locality(agency, cache=None):
+    """Returns the City of an agency."""
+    state = get_or_create(State, cache=cache, short_name='CA')
     if state.name is None or state.name == '':
         state.name = 'California'
         state.save()
-    locality, _ = City.objects.get_or_create(
+    locality = get_or_create(
+        City, cache=cache,
         name=agency['name'],
         state=state)
-    locality.short_name = agency['shortcut']
-    locality.save()
+    if cache is None or locality.short_name != agency['shortcut']:
+        locality.short_name = agency['shortcut']
+        locality.save()
+    return locality
+
+
+def parse_beneficiary(row, agency, verbosity=1, cache=None):
+    # Parse and save the beneficiary, contribution.
+    assert agency is not None, "Agency should be set."
 
+    locality = parse_agency_locality(agency, cache=cache)
     beneficiary = get_committee_beneficiary(row)
     beneficiary.locality = locality
-    beneficiary.name = clean_name(row['filerName'])
+    beneficiary.name = row['filerName']
     beneficiary.type = 'PF'  # ok
     # beneficiary.address = '?'  # TODO: fix
     beneficiary.save()
     return beneficiary
 
 
-def parse_candidate_and_office(row, verbosity=1):
-    import re
-    res = (
-        # David Alvarez for Mayor 2014
-        '^(?P<name>.*?)\s+for\s+(?P<office>.*?)(?P<year>[0-9]+).*$',
-        # Scott Sanborn City Council 2016
-        '^(?P<name>.*? .*?)\s+(?P<office>.*?)(?P<year>[0-9]+).*$',
-    )
+CANDIDATE_AND_OFFICE_RES = (
+    # David Alvarez for Mayor 2014
+    re.compile('^(?P<name>.*?)\s+for\s+(?P<office>.*?)(?P<year>[0-9]+).*$'),
+    # Scott Sanborn City Council 2016
+    re.compile('^(?P<name>.*? .*?)\s+(?P<office>.*?)(?P<year>[0-9]+).*$'),
+)
+
 
+def parse_candidate_and_office(row, verbosity=1):
     # Either find a match, or raise an error.
-    for re_str in res:
-        matches = re.match(re_str, clean_name(row['filerName']))
+    for regex in CANDIDATE_AND_OFFICE_RES:
+        matches = regex.match(row['filerName'])
         if matches is not None:
             matches = matches.groupdict()
             break
@@ -232,18 +596,35 @@ def parse_referendum_info(row, ballot, verbosity=1):
     return selection
 
 
-def parse_ballot_info(row, locality, verbosity=1):
+def parse_ballot_info(row, locality, verbosity=1, cache=None):
+    """
+    The ballot item selection a filer's money is for.
+
+    Ballot.from_date picks the ballot by locality alone, so the
+    selection only depends on the filer (name) and locality;
+    with a cache, it is worked out once per pair.
+    """
+    if cache is None:
+        return _parse_ballot_info(row, locality=locality, verbosity=verbosity), True
+    ballot_item_selection = cache.get_or_compute(
+        BallotItemSelection, (row['filerName'], locality.pk),
+        lambda: _parse_ballot_info(row, locality=locality, verbosity=verbosity))
+    return ballot_item_selection, True
+
+
+def _parse_ballot_info(row, locality, verbosity=1):
     ballot = Ballot.from_date(date=date_parse(row['tran_Date']),
                               locality=locality)
 
     # Figure out beneficiary from past entries.
-    past_money = models.IndependentMoney.objects.filter(
-        beneficiary__name=clean_name(row['filerName']),
-        beneficiary__ballot_item_selection__ballot_item__ballot=ballot)
-    if past_money.count() > 0:
+    past_money = models.IndependentMoney.objects \
+        .filter(beneficiary__name=row['filerName'],
+                beneficiary__ballot_item_selection__ballot_item__ballot=ballot) \
+        .select_related('beneficiary__ballot_item_selection') \
+        .first()
+    if past_money is not None:
         # Figure it out from past contributions.
-        ballot_item_selection = past_money[0] \
-            .beneficiary.ballot_item_selection
+        ballot_item_selection = past_money.beneficiary.ballot_item_selection
     else:
         # Figure out beneficiary from item text.
         try:
@@ -253,7 +634,52 @@ def parse_ballot_info(row, locality, verbosity=1):
             ballot_item_selection = parse_referendum_info(
                 row, ballot=ballot, verbosity=verbosity)
 
-    return ballot_item_selection, True
+    return ballot_item_selection
+
+
+def parse_support(row, beneficiary, verbosity=1, cache=None):
+    """Form 460 Schedule D says whether the money supports or opposes."""
+    support = row.get('sup_Opp_Cd')
+    beneficiary.support = (support == 'S')
+    if beneficiary.ballot_item_selection is None:
+        beneficiary.ballot_item_selection, _ = parse_ballot_info(
+            row, locality=beneficiary.locality, verbosity=verbosity, cache=cache)
+    beneficiary.save()
+
+
+# Fields that identify a loaded IndependentMoney row.
+MONEY_FIELDS = ('source', 'source_xact_id', 'filing_id', 'amount',
+                'cumulative_amount', 'report_date', 'benefactor_zip',
+                'benefactor', 'beneficiary')
+
+
+def parse_money(row, agency, verbosity=1, cache=None):
+    """
+    Parses (and saves) the benefactor, beneficiary and ballot info of a row.
+
+    Returns an unsaved IndependentMoney instance.
+    """
+    with profiled('benefactor', agency):
+        benefactor, bf_zip_code = parse_benefactor(
+            row, verbosity=verbosity, cache=cache)
+    with profiled('beneficiary', agency):
+        beneficiary = parse_beneficiary(
+            row, agency=agency, verbosity=verbosity, cache=cache)
+    with profiled('ballot', agency):
+        beneficiary.ballot_item_selection, beneficiary.support = parse_ballot_info(
+            row, locality=beneficiary.locality, verbosity=verbosity, cache=cache)
+        beneficiary.save()
+
+    return models.IndependentMoney(
+        source='NF',
+        source_xact_id=row['netFileKey'],
+        filing_id=row.get('filingId'),
+        amount=float(row['tran_Amt1']),
+        cumulative_amount=float(row.get('tran_Amt2', 0)) or None,
+        report_date=date_parse(row['tran_Date']),
+        benefactor_zip=bf_zip_code,
+        benefactor=benefactor,
+        beneficiary=beneficiary)
 
 
 def get_committee_benefactor(row):
@@ -262,10 +688,10 @@ def get_committee_benefactor(row):
     # $HACK; fields differ for contributions vs. expenditures!
     if row.get('form_Type') == 'D':
         filer_id = row.get('filerId') or row.get('filerLocalId') or row.get('filerStateId')
-        name = clean_name(row.get('filerName'))
+        name = row.get('filerName')
     else:
         filer_id = clean_filer_id(row.get('cmte_Id'))
-        name = clean_name(row.get('cand_NamL') or row.get('tran_NamL') or row.get(''))
+        name = row.get('cand_NamL') or row.get('tran_NamL') or row.get('')
 
     benefactor = None
 
@@ -308,7 +734,7 @@ def get_committee_beneficiary(row):
         filer_id = filer_id
 
     return models.Beneficiary.objects.get_or_create(
-        name=clean_name(row.get('filerName')), filer_id=filer_id)[0]
+        name=row.get('filerName'), filer_id=filer_id)[0]
 
 
 def clean_filer_id(filer_id):
@@ -326,7 +752,7 @@ def clean_filer_id(filer_id):
 
 
 @transaction.atomic
-def load_form_row(row, agency, force=False, verbosity=1):  # noqa
+def load_form_row(row, agency, force=False, verbosity=1, cache=None, new=False):  # noqa
     """ Loads an individual row from Form 460 Schedule A. # noqa
     This is where most of the magic happens!
 
@@ -334,6 +760,9 @@ def load_form_row(row, agency, force=False, verbosity=1):  # noqa
     True if data was loaded into the database,
     False if skipped b/c data already is there.
 
+    new says the row is known not to be loaded (see find_loaded_xacts),
+    so it is inserted without looking for it first.
+
     Some metadata:
     ^ calculated_Amount: None, -294.84,-200.0,50.0,99.0,100.0
     x calculated_Date: None, 2015-01-07T00:00:00.0000000-08
@@ -362,7 +791,7 @@ def load_form_row(row, agency, force=False, verbosity=1):  # noqa
     tran_Zip4      : Transaction Entity's Zip Code, 63105,75702,75711,90036,90040,
     """
 
-    if not force:
+    if not (force or new):
         try:
             # Get old money. If we have it, don't do anything--fast!!
             money = models.IndependentMoney.objects.get(
@@ -384,26 +813,19 @@ def load_form_row(row, agency, force=False, verbosity=1):  # noqa
         except models.IndependentMoney.DoesNotExist:
             pass
 
-    benefactor, bf_zip_code = parse_benefactor(
-        row, verbosity=verbosity)
-    beneficiary = parse_beneficiary(
-        row, agency=agency, verbosity=verbosity)
-    beneficiary.ballot_item_selection, beneficiary.support = parse_ballot_info(
-        row, locality=beneficiary.locality, verbosity=verbosity)
-    beneficiary.save()
+    money = parse_money(row, agency=agency, verbosity=verbosity, cache=cache)
 
-    # Now we have all the parts. Create and save it.
+    # Now we have all the parts. Create and save it
+    # (or, when forced, update the transaction's existing row).
     try:
-        money, created = models.IndependentMoney.objects.get_or_create(
-            source='NF',
-            source_xact_id=row['netFileKey'],
-            filing_id=row.get('filingId'),
-            amount=float(row['tran_Amt1']),
-            cumulative_amount=float(row.get('tran_Amt2', 0)) or None,
-            report_date=date_parse(row['tran_Date']),
-            benefactor_zip=bf_zip_code,
-            benefactor=benefactor,
-            beneficiary=beneficiary)
+        with profiled('money', agency):
+            if new:
+                money.save()
+                created = True
+            else:
+                money, created = models.IndependentMoney.objects.update_or_create(
+                    source=money.source, source_xact_id=money.source_xact_id,
+                    defaults=dict([(f, getattr(money, f)) for f in MONEY_FIELDS[2:]]))
     except Exception as E:
         print str(E)
         print row
@@ -418,7 +840,7 @@ def load_form_row(row, agency, force=False, verbosity=1):  # noqa
 
 
 @transaction.atomic
-def load_form460d_row(row, agency, force=False, verbosity=1):  # noqa
+def load_form460d_row(row, agency, force=False, verbosity=1, cache=None, new=False):  # noqa
     """ Loads an individual row from Form 460 Schedule A. # noqa
     This is where most of the magic happens!
 
@@ -454,30 +876,255 @@ def load_form460d_row(row, agency, force=False, verbosity=1):  # noqa
     """
 
     money, loaded = load_form_row(
-        row=row, agency=agency, force=force, verbosity=verbosity)
+        row=row, agency=agency, force=force, verbosity=verbosity, cache=cache,
+        new=new)
 
     # We can load some info about support/oppose.
     if loaded:
-        beneficiary = money.beneficiary
-        support = row.get('sup_Opp_Cd')
-        beneficiary.support = (support == 'S')
-        if beneficiary.ballot_item_selection is None:
-            beneficiary.ballot_item_selection, _ = parse_ballot_info(
-                row, locality=money.beneficiary.locality, verbosity=verbosity)
-        beneficiary.save()
-        print(beneficiary)
+        with profiled('ballot', agency):
+            parse_support(row, beneficiary=money.beneficiary, verbosity=verbosity,
+                          cache=cache)
+        print(money.beneficiary)
     return loaded
 
 
+def load_row(row, agency, form_type=None, force=False, verbosity=1, cache=None,
+             new=False):
+    """Loads a single (minimized) row with the loader for its form type."""
+    if form_type == 'D':
+        loader = load_form460d_row
+    else:
+        loader = load_form_row
+
+    if cache is None:
+        loaded = loader(row, agency=agency, force=force, verbosity=verbosity,
+                        new=new)
+    else:
+        with cache.discard_on_error():
+            loaded = loader(row, agency=agency, force=force,
+                            verbosity=verbosity, cache=cache, new=new)
+    return loaded if form_type == 'D' else loaded[1]
+
+
+def load_form_batch(rows, form_type=None, force=False, verbosity=1, cache=None,
+                    loaded_xacts=None):
+    """
+    Loads a chunk of rows in a single transaction.
+
+    Benefactors, beneficiaries and ballot info are resolved row by row,
+    each row in its own savepoint so that a bad row is rolled back on
+    its own (just like load_form_row). The new IndependentMoney rows are
+    then written with one bulk_create.
+
+    Rows whose netFileKey is already in the database (or earlier in
+    the chunk) are handed to the row-by-row loader, so that skips,
+    consistency checks and --force behave exactly the same.
+    The database is only asked which rows are there if loaded_xacts
+    (see find_loaded_xacts) isn't given; it gets the new rows' keys.
+
+    rows is a list of (ri, raw_row, minimal_row, agency) tuples;
+    returns a list of (ri, raw_row, minimal_row, exception) tuples.
+    """
+    cache = cache or DimensionCache()  # scoped to the chunk transaction
+
+    error_rows = []
+    try:
+        with cache.discard_on_error(), transaction.atomic():
+            if loaded_xacts is None:
+                existing = set()
+                for xacts in grouper(500, [r[2]['netFileKey'] for r in rows]):
+                    existing.update(models.IndependentMoney.objects.filter(
+                        source='NF', source_xact_id__in=xacts)
+                        .values_list('source_xact_id', flat=True))
+            else:
+                existing = set([r[2]['netFileKey'] for r in rows
+                                if r[2]['netFileKey'] in loaded_xacts])
+            new_keys = []
+
+            new_money = []
+            for ri, raw_row, minimal_row, agency in rows:
+                xact_key = minimal_row['netFileKey']
+                if xact_key in existing:
+                    # Flush first, so the row loader sees all prior rows.
+                    with profiled('money'):
+                        models.IndependentMoney.objects.bulk_create(new_money)
+                    new_money = []
+
+                try:
+                    if xact_key in existing:
+                        load_row(minimal_row, agency=agency, form_type=form_type,
+                                 force=force, verbosity=verbosity, cache=cache)
+                        continue
+
+                    with cache.discard_on_error(), transaction.atomic():
+                        money = parse_money(minimal_row, agency=agency,
+                                            verbosity=verbosity, cache=cache)
+                        if form_type == 'D':
+                            with profiled('ballot', agency):
+                                parse_support(minimal_row, beneficiary=money.beneficiary,
+                                              verbosity=verbosity, cache=cache)
+                    new_money.append(money)
+                    new_keys.append(xact_key)
+                    existing.add(xact_key)
+                except Exception as ex:
+                    error_rows.append((ri, raw_row, minimal_row, ex))
+
+            with profiled('money'):
+                models.IndependentMoney.objects.bulk_create(new_money)
+        if loaded_xacts is not None:
+            loaded_xacts.update(new_keys)
+
+    except DatabaseError as ex:
+        # The whole chunk was rolled back; redo it row by row,
+        # so that only the offending rows are lost.
+        logging.warning("Batch insert failed (%s); loading row by row.", ex)
+        error_rows = []
+        for ri, raw_row, minimal_row, agency in rows:
+            try:
+                load_row(minimal_row, agency=agency, form_type=form_type,
+                         force=force, verbosity=verbosity, cache=cache)
+                if loaded_xacts is not None:
+                    loaded_xacts.add(minimal_row['netFileKey'])
+            except Exception as ex:
+                error_rows.append((ri, raw_row, minimal_row, ex))
+
+    return error_rows
+
+
 def minimize_row(raw_row):
-    """Return a row with all 'None' entries removed."""
-    minimal_row = raw_row.copy()
+    """Return a row (as a dict) with all 'None' entries removed."""
+    return dict([(col, val) for col, val in raw_row.items()
+                 if not (isnone(val) or isnan(val))])
 
-    # remove useless columns for easier exploring
-    for col in minimal_row.keys():
-        if isnone(minimal_row[col]) or isnan(minimal_row[col]):
-            del minimal_row[col]
-    return minimal_row
+
+def read_form_csv(csv_path, chunk_size=None):
+    """
+    Reads the combined netfile CSV, as an iterator over DataFrames.
+
+    With a chunk_size, the file is streamed chunk_size rows at a time;
+    otherwise, it is read in one go.
+
+    All columns are read as strings (the row loaders convert the values
+    they use), so every chunk gets the same types, rather than whatever
+    pandas infers from the rows in it.
+    """
+    reader = pd.read_csv(csv_path, dtype=object, na_values=['None'],
+                         chunksize=chunk_size)
+    return reader if chunk_size else iter([reader])
+
+
+def prime_dimension_cache(data, agency_fn, cache):
+    """
+    Creates the State, City, ZipCode, Employer and Party rows that data
+    will need, through cache.
+
+    None of these have unique constraints, so loaders running in
+    parallel could each create the same row; creating them all up front
+    (and handing workers the warm cache) avoids that.
+    """
+    data = clean_form_data(data)
+    columns = [col for col in ('tran_ST', 'tran_City', 'tran_Zip4') if col in data]
+    for _, row in data[columns].drop_duplicates().iterrows():
+        parse_location(minimize_row(row), cache=cache)
+
+    if 'entity_Cd' not in data:
+        return
+    if 'tran_Emp' in data:
+        for name in data[data['entity_Cd'] == 'IND']['tran_Emp'].dropna().unique():
+            if not isnone(name) and name:
+                get_or_create(models.Employer, cache=cache, name=name)
+    if 'tran_NamL' in data:
+        for name in data[data['entity_Cd'] == 'PTY']['tran_NamL'].unique():
+            name = None if isnone(name) or isnan(name) else name
+            parse_party_from_name(name or '', cache=cache)
+
+    if 'agency_shortcut' in data:
+        for shortcut in data['agency_shortcut'].dropna().unique():
+            agency = agency_fn({'agency_shortcut': shortcut})
+            if agency is not None:
+                parse_agency_locality(agency, cache=cache)
+
+
+def split_by_agency(data):
+    """
+    Splits data into partitions that can be loaded in parallel: one per
+    agency, except that agencies whose rows share a filer or contributor
+    name, or a committee's filer ID, are kept together.
+
+    Beneficiaries and benefactors are looked up by name or filer ID (see
+    parse_benefactor, get_committee_benefactor, get_committee_beneficiary)
+    and have no unique constraints, so workers loading rows that share
+    one could each create it.
+    """
+    agencies = data['agency_shortcut'].fillna('')
+    cleaned = clean_form_data(data)
+    columns = pd.DataFrame(dict([
+        (col, cleaned[col] if col in cleaned else None)
+        for col in ('form_Type', 'entity_Cd', 'tran_NamL', 'tran_NamF', 'cand_NamL',
+                    'filerName', 'cmte_Id', 'filerId', 'filerLocalId', 'filerStateId')]))
+    columns['agency'] = agencies.values
+    columns = columns.astype(object)
+    columns = columns.where(columns.notnull(), None).drop_duplicates()
+
+    parents = dict()
+
+    def find_root(agency):
+        while parents.get(agency, agency) != agency:
+            agency = parents[agency]
+        return agency
+
+    owners = dict()
+    for row in columns.to_dict('records'):
+        if row['entity_Cd'] == 'IND':
+            keys = [('person', row['tran_NamL'], row['tran_NamF'])]
+        else:
+            # Committees are matched by filer ID first (see get_committee_benefactor).
+            if row['form_Type'] == 'D':
+                filer_id = row['filerId'] or row['filerLocalId'] or row['filerStateId']
+            else:
+                filer_id = clean_filer_id(row['cmte_Id'])
+            keys = [('name', row['tran_NamL']), ('name', row['cand_NamL']),
+                    ('filer_id', filer_id)]
+        keys.append(('name', row['filerName']))
+        agency = row['agency']
+        for key in keys:
+            if not any(key[1:]):
+                continue  # (a blank name would join every agency)
+            root1, root2 = find_root(owners.setdefault(key, agency)), find_root(agency)
+            if root1 != root2:
+                parents[max(root1, root2)] = min(root1, root2)
+
+    return [part for _, part in data.groupby(agencies.map(find_root).values, sort=False)]
+
+
+# Columns the row loaders use.
+LOADER_COLUMNS = (
+    'agency_shortcut', 'cand_NamL', 'cmte_Id', 'entity_Cd', 'filerId',
+    'filerLocalId', 'filerName', 'filerStateId', 'filingId', 'form_Type',
+    'netFileKey', 'rec_Type', 'sup_Opp_Cd', 'tran_Amt1', 'tran_Amt2',
+    'tran_City', 'tran_Date', 'tran_Emp', 'tran_NamF', 'tran_NamL',
+    'tran_Occ', 'tran_ST', 'tran_Zip4')
+
+
+def read_form_parquet(parquet_path, partitions=None, columns=LOADER_COLUMNS):
+    """
+    Reads the combined netfile Parquet file (see downloadnetfilerawdata
+    --parquet), as an iterator over one DataFrame per agency/year.
+
+    Only the given columns are read, and only the given partitions
+    ('<agency>_<year>'; default: all of them).
+    """
+    pa = downloadnetfilerawdata.import_pyarrow()
+    parquet_file = pa.parquet.ParquetFile(parquet_path)
+
+    with open(parquet_path + '.json', 'r') as fp:
+        index = json.load(fp)
+    row_groups = sorted([index[p]['row_group'] for p in partitions or index
+                         if p in index])
+    columns = [col for col in columns if col in parquet_file.schema.names]
+
+    return (parquet_file.read_row_group(row_group, columns=columns).to_pandas()
+            for row_group in row_groups)
 
 
 def grouper(n, iterable, fillvalue=None):
@@ -488,46 +1135,62 @@ def grouper(n, iterable, fillvalue=None):
     return izip_longest(fillvalue=fillvalue, *args)
 
 
-def find_unloaded_rows(data, skip_rate=100, force=False, verbosity=1):
+def find_loaded_xacts():
     """
-    Get a list of 0 to skip_rate rows of transactions not in the DB.
+    The set of all Netfile transaction IDs (netFileKeys) in the DB,
+    read in one pass.
     """
-    xact_keys = data['netFileKey']
-    for xacts in grouper(skip_rate, xact_keys):
-        vals = [v['source_xact_id'] for v in models.IndependentMoney.objects.filter(
-            source='NF', source_xact_id__in=xacts).values('source_xact_id')]
-        for val in vals:
-            logging.debug("Skipping NF/%s", val)
-
-        if force:
-            yield set(xacts)
-        else:
-            yield set(xacts) - set(vals)  # missing set
+    return set(models.IndependentMoney.objects
+               .filter(source='NF')
+               .order_by()
+               .values_list('source_xact_id', flat=True)
+               .iterator())
 
 
 def load_form_data(data, agency_fn, form_name, form_type=None,
-                   force=False, verbosity=1):
+                   force=False, batch_size=None, verbosity=1, cache=None,
+                   loaded_xacts=None, error_log=None):
     """
+    Loads all rows of a form type.
+
+    With a batch_size, rows are loaded batch_size at a time
+    with load_form_batch, rather than one transaction per row.
+    cache is a DimensionCache, shared over the load run.
+
+    loaded_xacts is the set of netFileKeys already loaded (by default,
+    read with find_loaded_xacts); only rows not in it are loaded
+    (unless forced), and it gets the keys of the rows that are.
+    Repeats of a netFileKey are skipped.
+
+    Returns the rows that failed to load, as (ri, raw_row, minimal_row,
+    exception) tuples; with an error_log (LoadErrorLog), they are
+    logged as they happen instead.
     """
     if form_type is not None:
         data = data[data['form_Type'] == form_type]
 
     if verbosity > 0:
         print("Attempting to load %d rows of %s data." % (len(data), form_name))
+    with profiled('clean'):
+        data = clean_form_data(data)
+
+    if loaded_xacts is None:
+        loaded_xacts = find_loaded_xacts()
+    to_load = ~data['netFileKey'].duplicated().values
+    if not force:
+        to_load &= np.array([xact_key not in loaded_xacts
+                             for xact_key in data['netFileKey']], dtype=bool)
+    if verbosity > 0 and not to_load.all():
+        print("Skipping %d rows already loaded." % (len(data) - to_load.sum()))
 
     # Parse out the contributor information.
     error_rows = []
-    xact_key_generator = find_unloaded_rows(data, force=force, verbosity=verbosity)
-    xact_keys = []
+    batch = []
     count = 0
-    for ri, (_, raw_row) in enumerate(data.T.iteritems()):
-        # Quickly get near an unloaded row.
-        while not xact_keys and xact_keys is not None:
-            xact_keys = next(xact_key_generator)
-        if xact_keys is None or raw_row['netFileKey'] not in xact_keys:
-            continue
-        xact_keys = xact_keys - set([raw_row['netFileKey']])
-
+    columns = list(data.columns)
+    for ri, values in zip(np.flatnonzero(to_load),
+                          data[to_load].itertuples(index=False, name=None)):
+        raw_row = dict(zip(columns, values))
         minimal_row = minimize_row(raw_row)
 
         assert minimal_row.get('rec_Type') in ('RCPT', 'S497', 'EXPN')
@@ -539,18 +1202,40 @@ def load_form_data(data, agency_fn, form_name, form_type=None,
             # 460D data is different...
             if form_type == 'D':
                 minimal_row['entity_Cd'] = minimal_row.get('entity_Cd', 'CRT')
-                load_form460d_row(
-                    minimal_row, agency=agency, force=force, verbosity=verbosity)
+
+            if batch_size:
+                batch.append((ri, raw_row, minimal_row, agency))
             else:
-                load_form_row(
-                    minimal_row, agency=agency, force=force, verbosity=verbosity)
+                xact_key = minimal_row['netFileKey']
+                load_row(minimal_row, agency=agency, form_type=form_type,
+                         force=force, verbosity=verbosity, cache=cache,
+                         new=xact_key not in loaded_xacts)
+                loaded_xacts.add(xact_key)
         except Exception as ex:
             error_rows.append((ri, raw_row, minimal_row, ex))
 
+        if batch_size and len(batch) >= batch_size:
+            error_rows += load_form_batch(
+                batch, form_type=form_type, force=force, verbosity=verbosity,
+                cache=cache, loaded_xacts=loaded_xacts)
+            batch = []
+
+        if error_log is not None and error_rows:
+            error_log.add(error_rows)
+            error_rows = []
+
         count += 1
         if (count % 1000) == 0:
             print("Loaded %d records" % count)
 
+    if batch:
+        error_rows += load_form_batch(
+            batch, form_type=form_type, force=force, verbosity=verbosity,
+            cache=cache, loaded_xacts=loaded_xacts)
+
+    if error_log is not None:
+        error_log.add(error_rows)
+        error_rows = []
     return error_rows
 
 
@@ -563,6 +1248,47 @@ custom_options = (
         help="Form types to upload (comma-separated list; "
              "choices=('A', 'C', 'F497P1', 'F496P3')"
     ),
+    make_option(
+        "--chunk-size",
+        action="store",
+        type="int",
+        dest="chunk_size",
+        default=None,
+        help="Stream the combined CSV this many rows at a time "
+             "(default: read the whole file)"
+    ),
+    make_option(
+        "--workers",
+        action="store",
+        type="int",
+        dest="workers",
+        default=1,
+        help="Load agencies in parallel, in this many processes"
+    ),
+    make_option(
+        "--batch-size",
+        action="store",
+        type="int",
+        dest="batch_size",
+        default=None,
+        help="Load rows in transactions of this many rows, "
+             "with bulk inserts (default: one row at a time)"
+    ),
+    make_option(
+        "--retry-errors",
+        action="store_true",
+        dest="retry_errors",
+        default=False,
+        help="Only load the rows that failed before (see LoadError)"
+    ),
+    make_option(
+        "--profile",
+        action="store",
+        dest="profile",
+        default=None,
+        help="Time each load stage, per form type and agency, and "
+             "write the report (JSON) to this path"
+    ),
 )
 
 
@@ -587,6 +1313,11 @@ class Command(downloadnetfilerawdata.Command):
                 raise CommandError("Unknown form type '%s'  ; choose from %s" % (
                     form_type, ALL_FORM_TYPES))
             self.forms += [f for f in self.FORM_TYPES if f['form_type'] == form_type]
+        self.batch_size = options['batch_size']
+        self.chunk_size = options['chunk_size']
+        self.workers = options['workers']
+        self.profile_path = options['profile']
+        self.retry_errors = options['retry_errors']
 
         super(Command, self).handle(*args, **options)
 
@@ -608,34 +1339,135 @@ class Command(downloadnetfilerawdata.Command):
             and only those beginning from the ending period of the
             last Form 460 that was filed
         """
-        if self.verbosity:
-            self.header("Loading disclosure data into database.")
+        global _profile
 
-        self.data = pd.read_csv(self.combined_csv_path)
         if self.verbosity:
-            self.header("There are %d rows in %s" % (
-                        len(self.data), self.combined_csv_path))
+            self.header("Loading disclosure data into database.")
+        if self.profile_path:
+            _profile = LoadProfile()
+            _profile.start()
+
+        if self.parquet:
+            # One chunk per agency/year.
+            data_path = self.combined_parquet_path
+            chunks = read_form_parquet(data_path, partitions=[
+                '%s_%s' % (agency, year)
+                for agency, year in product(self.agencies, self.years)])
+        else:
+            data_path = self.combined_csv_path
+            chunks = read_form_csv(data_path, chunk_size=self.chunk_size)
+
+        self.cache = DimensionCache()
+        self.loaded_xacts = find_loaded_xacts()
+        self.error_log = LoadErrorLog()
+        last_error_id = models.LoadError.objects.aggregate(Max('id'))['id__max'] or 0
+        if self.retry_errors:
+            retry_xacts = set(models.LoadError.objects
+                              .filter(source='NF')
+                              .values_list('source_xact_id', flat=True))
 
+        try:
+            num_rows = 0
+            for data in profiled_iter('read', chunks):
+                if self.retry_errors:
+                    data = data[data['netFileKey'].isin(retry_xacts)]
+                    if len(data) == 0:
+                        continue
+                num_rows += len(data)
+                if self.workers > 1:
+                    self.load_chunk_in_parallel(data)
+                else:
+                    self.load_chunk(data)
+
+            clear_load_errors(last_error_id)
+            if self.verbosity:
+                self.header("Loaded %d rows from %s" % (num_rows, data_path))
+                print(self.cache.summary())
+                if self.error_log.num_errors:
+                    print("%d rows failed to load; see LoadError." % self.error_log.num_errors)
+
+            with profiled('summaries'):
+                num_summaries = refresh_money_summaries()
+            if self.verbosity:
+                print("Refreshed %d money summaries." % num_summaries)
+
+            if _profile is not None:
+                _profile.stop()
+                with open(self.profile_path, 'w') as fp:
+                    json.dump(_profile.report(), fp, indent=2, sort_keys=True)
+                if self.verbosity:
+                    print(_profile.summary())
+                    print("Wrote the load profile to %s" % self.profile_path)
+                _profile = None
+        finally:
+            # New (or partly loaded) data; don't serve cached responses.
+            data_version = DataVersion.bump()
+            if self.verbosity:
+                print("Data is now at version %d." % data_version.version)
+
+    def load_chunk(self, data):
+        """Loads the rows of each form type in data (all or part of the CSV)."""
         # Check for any potentially missing data.
-        form_types = self.data['form_Type'].unique()
-        if len({None, np.nan} - set(form_types)) != 2:
+        if data['form_Type'].isnull().any():
             warnings.warn("Some data don't have form_Type set.")
 
         for form_info in self.forms:
+            if _profile is not None:
+                _profile.form_type = form_info['form_type']
             try:
-                error_rows = load_form_data(
-                    data=self.data, verbosity=self.verbosity, force=self.force,
+                load_form_data(
+                    data=data, verbosity=self.verbosity, force=self.force,
+                    batch_size=self.batch_size, cache=self.cache,
+                    loaded_xacts=self.loaded_xacts, error_log=self.error_log,
                     agency_fn=lambda row: self.get_agency(row['agency_shortcut']),
                     **form_info)
-
-                # Report errors  TODO: push to the database.
-                if len(error_rows) > 0:
-                    print("Encountered %d errors; debug!" % len(error_rows))
-                    print("Errors:\n%s" % ",\n".join([str(e[-1]) for e in error_rows]))
             except SkipForm:
                 if self.verbosity > 0:
                     print("Skipping irrelevant form data from %s" % form_info)
                 continue
+        self.error_log.flush()
+        if _profile is not None:
+            _profile.form_type = None
+
+    def load_chunk_in_parallel(self, data):
+        """
+        Loads each agency's rows of data in a pool of worker processes
+        (agencies that share beneficiaries or benefactors together; see
+        split_by_agency).
+
+        Workers are forked with the shared dimension rows already created
+        and cached, and open their own database connections.
+        """
+        global _worker_state
+
+        partitions = split_by_agency(data)
+        form_types = [form_info['form_type'] for form_info in self.forms]
+        prime_dimension_cache(
+            data[data['form_Type'].isin(form_types)], cache=self.cache,
+            agency_fn=lambda row: self.get_agency(row['agency_shortcut']))
+
+        # Forked processes must not share the parent's connections
+        # (or pending errors).
+        self.error_log.flush()
+        connections.close_all()
+        _worker_state = (self, partitions)
+        pool = multiprocessing.Pool(min(self.workers, len(partitions)))
+        try:
+            for (hits, misses, num_errors, profile, loaded_xacts,
+                 cache_entries) in pool.imap_unordered(
+                    _load_partition, range(len(partitions))):
+                # So later chunks know what the workers loaded (and looked up).
+                self.loaded_xacts.update(loaded_xacts)
+                self.cache.add_entries(cache_entries)
+                self.cache.hits.update(hits)
+                self.cache.misses.update(misses)
+                self.error_log.num_errors += num_errors
+                if _profile is not None:
+                    _profile.merge(*profile)
+        finally:
+            pool.close()
+            pool.join()
+            _worker_state = None
 
     def get_agency(self, agency_shortcut):
         agency_matches = filter(lambda a: a['shortcut'] == agency_shortcut,
@@ -649,3 +1481,33 @@ class Command(downloadnetfilerawdata.Command):
             agency['name'] = agency['name'][:-9]
 
         return agency
+
+
+# (command, partitions) for pool workers; inherited when they are forked.
+_worker_state = None
+
+
+def _load_partition(index):
+    """
+    Loads one partition of a chunk, in a pool worker.
+
+    Returns the worker's lookup counts, number of errors and profile,
+    the netFileKeys of the partition that are loaded, and the lookups
+    the worker added to the cache.
+    """
+    command, partitions = _worker_state
+    partition = partitions[index]
+    cache_mark = command.cache.num_new_entries()
+    command.cache.hits, command.cache.misses = Counter(), Counter()
+    command.error_log.num_errors = 0
+    if _profile is not None:
+        _profile.stats, _profile.errors = defaultdict(Counter), Counter()
+    try:
+        command.load_chunk(partition)
+    finally:
+        connections.close_all()
+    profile = None if _profile is None else (dict(_profile.stats), _profile.errors)
+    loaded_xacts = [xact_key for xact_key in partition['netFileKey'].dropna().unique()
+                    if xact_key in command.loaded_xacts]
+    return (command.cache.hits, command.cache.misses, command.error_log.num_errors,
+            profile, loaded_xacts, command.cache.get_new_entries(cache_mark))
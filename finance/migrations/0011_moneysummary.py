@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ballot', '0002_auto_20160304_2151'),
+        ('finance', '0010_auto_20160725_0504'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MoneySummary',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('summary', models.TextField(help_text='summarize_money output, as JSON')),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('ballot', models.OneToOneField(null=True, default=None, blank=True, to='ballot.Ballot')),
+                ('beneficiary', models.OneToOneField(null=True, default=None, blank=True, to='finance.Beneficiary')),
+            ],
+            options={
+                'verbose_name_plural': 'money summaries',
+            },
+        ),
+    ]
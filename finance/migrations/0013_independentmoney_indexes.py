@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def delete_duplicate_money(apps, schema_editor):
+    """Keeps the first-loaded row of each transaction, so it can be made unique."""
+    IndependentMoney = apps.get_model('finance', 'IndependentMoney')
+    duplicates = IndependentMoney.objects \
+        .values('source', 'source_xact_id') \
+        .annotate(num_rows=models.Count('id'), first_id=models.Min('id')) \
+        .filter(num_rows__gt=1) \
+        .order_by()
+    for duplicate in duplicates:
+        IndependentMoney.objects \
+            .filter(source=duplicate['source'], source_xact_id=duplicate['source_xact_id']) \
+            .exclude(id=duplicate['first_id']) \
+            .delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0012_benefactor_concrete_type'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_money, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='independentmoney',
+            name='report_date',
+            field=models.DateField(db_index=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='independentmoney',
+            unique_together=set([('source', 'source_xact_id')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='independentmoney',
+            index_together=set([('benefactor', 'report_date'), ('beneficiary', 'report_date')]),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0013_independentmoney_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoadError',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('source', models.CharField(help_text='e.g. Netfile', max_length=2, choices=[('NF', 'Netfile')])),
+                ('source_xact_id', models.CharField(help_text='Transaction ID (specific to data source)', max_length=32, db_index=True)),
+                ('form_type', models.CharField(max_length=8)),
+                ('agency', models.CharField(default=None, max_length=16, null=True, help_text='Agency shortcut (none if unknown)', blank=True)),
+                ('error_type', models.CharField(help_text='Exception class', max_length=64)),
+                ('message', models.TextField(blank=True)),
+                ('row', models.TextField(help_text='The loaded columns of the row, as JSON')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ('-created',),
+            },
+        ),
+    ]
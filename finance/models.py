@@ -3,12 +3,17 @@ Models related to campaign finance for referendum choices and candidates.
 """
 
 from __future__ import unicode_literals
+from django.contrib.admin.models import LogEntry
 from django.db import models
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from django.utils.encoding import python_2_unicode_compatible
 
 from _django_utils.serializers import as_money
 from ballot.models import PersonMixin, SocialMediaMixin
-from locality.models import AddressMixin, ReverseLookupStringMixin
+from generic_dedupe.signals import dedupe_applied, dedupe_reverted
+from locality.models import (AddressMixin, ConcreteTypeMixin,
+                             ReverseLookupStringMixin, reverse_lookup_all)
 
 
 @python_2_unicode_compatible
@@ -70,7 +75,7 @@ class OtherMixin(SocialMediaMixin, AddressMixin):
 
 
 @python_2_unicode_compatible
-class Benefactor(models.Model, ReverseLookupStringMixin):
+class Benefactor(ConcreteTypeMixin, ReverseLookupStringMixin):
     """
     Main list of benefactors.
     """
@@ -129,7 +134,7 @@ class OtherBenefactor(Benefactor, OtherMixin):
     def __init__(self, *args, **kwargs):
         super(self.__class__, self).__init__(*args, **kwargs)
         self.benefactor_type = 'OT'
-        self.benefactor_locality = self.locality
+        self.benefactor_locality_id = self.locality_id  # (without fetching it)
 
     def __str__(self):
         # See https://code.djangoproject.com/ticket/25218 on why __unicode__
@@ -148,7 +153,7 @@ class CommitteeBenefactor(Benefactor, Committee):
     def __init__(self, *args, **kwargs):
         super(self.__class__, self).__init__(*args, **kwargs)
         self.benefactor_type = self.type
-        self.benefactor_locality = self.locality
+        self.benefactor_locality_id = self.locality_id  # (without fetching it)
 
     def __str__(self):
         # See https://code.djangoproject.com/ticket/25218 on why __unicode__
@@ -194,6 +199,35 @@ class Beneficiary(Committee):
         total = money.aggregate(models.Sum('amount')) or 0
         return as_money(total.values()[0])
 
+    def get_contributors(self):
+        """
+        Benefactors to this beneficiary, each with its contributions
+        (to this beneficiary) and total_contributions (to any).
+
+        Takes a fixed number of queries, however many benefactors;
+        their types and localities are looked up all together.
+        """
+        benefactors = Benefactor.objects.filter(independentmoney__beneficiary=self)
+        totals = dict(IndependentMoney.objects
+                      .filter(benefactor__in=benefactors.values('pk'))
+                      .order_by()
+                      .values_list('benefactor')
+                      .annotate(total=models.Sum('amount')))
+        benefactors = list(benefactors
+                           .annotate(contributions=models.Sum('independentmoney__amount'))
+                           .select_related('benefactor_locality'))
+
+        concrete_benefactors = reverse_lookup_all(benefactors, 'benefactor_locality')
+        reverse_lookup_all(
+            [benefactor.benefactor_locality
+             for benefactor in benefactors + concrete_benefactors
+             if benefactor is not None and benefactor.benefactor_locality is not None])
+
+        for benefactor in benefactors:
+            benefactor.contributions = as_money(benefactor.contributions)
+            benefactor.total_contributions = as_money(totals[benefactor.pk])
+        return benefactors
+
     class Meta:
         verbose_name_plural = 'beneficiaries'
         ordering = Committee._meta.ordering
@@ -210,7 +244,7 @@ class IndependentMoney(models.Model):
     cumulative_amount = models.FloatField(
         help_text="Total monetary value of provided benefits, to date of this transaction.",
         blank=True, null=True, default=None)
-    report_date = models.DateField()
+    report_date = models.DateField(db_index=True)
 
     benefactor_zip = models.ForeignKey('locality.ZipCode')
     benefactor = models.ForeignKey('Benefactor', help_text='Gave the benefit')
@@ -220,7 +254,6 @@ class IndependentMoney(models.Model):
         max_length=2, choices=SOURCE_TYPES, help_text="e.g. Netfile")
     source_xact_id = models.CharField(
         max_length=32, help_text="Transaction ID (specific to data source)")
-    unique_together = ("source", "source_xact_id")
 
     filing_id = models.CharField(
         max_length=32, help_text="Transaction ID (specific to government processing entity)",
@@ -240,3 +273,62 @@ class IndependentMoney(models.Model):
         verbose_name_plural = 'independent money'
         ordering = ('-beneficiary__ballot_item_selection__ballot_item__ballot__date',  # noqa
                     '-report_date', )
+        # Loads look rows up by transaction; views list them by committee.
+        unique_together = (('source', 'source_xact_id'),)
+        index_together = (('beneficiary', 'report_date'),
+                          ('benefactor', 'report_date'))
+
+
+@python_2_unicode_compatible
+class LoadError(models.Model):
+    """
+    A source row that failed to load, and why; failed rows can be
+    retried with xformnetfilerawdata --retry-errors.
+    """
+    source = models.CharField(
+        max_length=2, choices=IndependentMoney.SOURCE_TYPES, help_text="e.g. Netfile")
+    source_xact_id = models.CharField(
+        max_length=32, db_index=True,
+        help_text="Transaction ID (specific to data source)")
+    form_type = models.CharField(max_length=8)
+    agency = models.CharField(max_length=16, null=True, default=None, blank=True,
+                              help_text="Agency shortcut (none if unknown)")
+    error_type = models.CharField(max_length=64, help_text="Exception class")
+    message = models.TextField(blank=True)
+    row = models.TextField(help_text="The loaded columns of the row, as JSON")
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return "[%s] %s/%s: %s" % (self.form_type, self.source,
+                                   self.source_xact_id, self.error_type)
+
+    class Meta:
+        ordering = ('-created',)
+
+
+class MoneySummary(models.Model):
+    """
+    Precomputed summary of the money for a ballot, or to a beneficiary
+    (see finance.summaries); refreshed after each Netfile load, and
+    dropped on other changes (see clear_money_summaries).
+    """
+    ballot = models.OneToOneField(
+        'ballot.Ballot', null=True, default=None, blank=True)
+    beneficiary = models.OneToOneField(
+        'Beneficiary', null=True, default=None, blank=True)
+    summary = models.TextField(help_text="summarize_money output, as JSON")
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'money summaries'
+
+
+@receiver(post_save, sender=LogEntry)
+@receiver([dedupe_applied, dedupe_reverted])
+def clear_money_summaries(sender, **kwargs):
+    """
+    Changes through the admin (or deduping) can change any summary,
+    so they're summarized on demand until the next load refreshes them.
+    """
+    if kwargs.get('created', True):
+        MoneySummary.objects.all().delete()
@@ -24,7 +24,7 @@ class BenefactorSerializer(ExtendedModelSerializer):
     benefactor_type = serializers.CharField(max_length=50, source='get_benefactor_type_display')
     name = serializers.CharField(source='__str__')
     contributions = serializers.FloatField()
-    total_contributions = serializers.FloatField(source='get_contributions')
+    total_contributions = serializers.FloatField()
 
     def __init__(self, models=None, beneficiary=None, *args, **kwargs):
         self.beneficiary = beneficiary
@@ -32,12 +32,16 @@ class BenefactorSerializer(ExtendedModelSerializer):
 
     def to_representation(self, instance):
         """
-        Add the 'contributions' property to a benefactor, for this particular beneficiary.
+        Add the 'contributions' property to a benefactor, for this particular beneficiary
+        (and 'total_contributions', over all), unless already there (see
+        Beneficiary.get_contributors).
 
         TODO: fix this; this is hacky.
         """
         if not hasattr(instance, 'contributions'):
             instance.contributions = instance.get_contributions(beneficiary=self.beneficiary)
+        if not hasattr(instance, 'total_contributions'):
+            instance.total_contributions = instance.get_contributions()
         return super(BenefactorSerializer, self).to_representation(instance)
 
     class Meta:
@@ -0,0 +1,136 @@
+"""
+Summaries of the money for a ballot, or to a beneficiary.
+
+These are precomputed into MoneySummary after each Netfile load
+(see refresh_money_summaries); anything without a stored summary
+is summarized on demand.
+"""
+import json
+import logging
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from _django_utils.serializers import as_money
+from ballot.models import Ballot
+from locality.models import Locality
+from .models import Beneficiary, IndependentMoney, MoneySummary
+
+logger = logging.getLogger(__name__)
+
+
+def summarize_money(locality, benefits):
+    # One grouped query, by benefactor type and location; each group
+    # then falls into its area. (Conditional sums in the query would
+    # inner-join the benefactor locality, losing rows without one.)
+    benefits_grouped = benefits \
+        .order_by() \
+        .values('benefactor__benefactor_type',
+                'benefactor__benefactor_locality',
+                'benefactor__benefactor_locality__city__state') \
+        .annotate(count=Count('id'), total=Sum(F('amount')))
+
+    # Simple measures
+    num_contributions = 0
+    total_benefits = None  # None for empty
+
+    # Summary measures by benefactor type
+    key_map = dict(IN='individual', OT='other',
+                   PF='recipient_committee', PY='political_party',
+                   IC='independent_committee')
+    benefits_by_type = dict()
+
+    # Summarize by locality.
+    total_by_locality = dict(unknown_location=0, inside_location=0,
+                             inside_state=0, outside_state=0)
+
+    for vals in benefits_grouped:
+        num_contributions += vals['count']
+        total_benefits = (total_benefits or 0) + vals['total']
+        type_key = key_map[vals['benefactor__benefactor_type']]  # alias keys
+        benefits_by_type[type_key] = benefits_by_type.get(type_key, 0) + vals['total']
+
+        benefactor_locality = vals['benefactor__benefactor_locality']
+        if benefactor_locality is None:
+            total_by_locality['unknown_location'] += vals['total']
+        elif vals['benefactor__benefactor_locality__city__state'] == locality.state_id:
+            total_by_locality['inside_state'] += vals['total']
+        else:
+            total_by_locality['outside_state'] += vals['total']
+        if benefactor_locality == locality.id:
+            total_by_locality['inside_location'] += vals['total']
+
+    benefits_by_type = dict([(key, as_money(val))
+                             for key, val in benefits_by_type.items()])
+    total_by_locality = dict([(key, as_money(val))
+                              for key, val in total_by_locality.items()])
+
+    return {  # done, manually
+        "location": {
+            "name": locality.name or locality.short_name,
+            "id": locality.id,
+        },
+        "contribution_total": as_money(total_benefits),
+        "contribution_count": as_money(num_contributions),
+        "contribution_by_type": benefits_by_type,
+        "contribution_by_area": total_by_locality,
+    }
+
+
+def summarize_ballot(ballot):
+    locality = Locality.objects.get(id=ballot.locality_id).reverse_lookup()
+
+    # Get all relevant rows of IndependentMoney
+    benefits = IndependentMoney.objects.filter(
+        beneficiary__ballot_item_selection__ballot_item__ballot=ballot)
+    return summarize_money(locality=locality, benefits=benefits)
+
+
+def summarize_beneficiary(beneficiary):
+    benefits = IndependentMoney.objects.filter(beneficiary=beneficiary)
+    locality = beneficiary.locality.reverse_lookup()  # upgrade
+    return summarize_money(locality=locality, benefits=benefits)
+
+
+def get_ballot_summary(ballot):
+    """The stored summary of a ballot (else, a fresh one)."""
+    try:
+        return json.loads(MoneySummary.objects.get(ballot=ballot).summary)
+    except MoneySummary.DoesNotExist:
+        return summarize_ballot(ballot)
+
+
+def get_beneficiary_summary(beneficiary):
+    """The stored summary of a beneficiary (else, a fresh one)."""
+    try:
+        return json.loads(MoneySummary.objects.get(beneficiary=beneficiary).summary)
+    except MoneySummary.DoesNotExist:
+        return summarize_beneficiary(beneficiary)
+
+
+def summarize_each(items, summarize, field):
+    """
+    MoneySummary rows for each item that can be summarized; items
+    that can't (e.g. a ballot without a city) are logged and skipped.
+    """
+    summaries = []
+    for item in items:
+        try:
+            summary = summarize(item)
+        except Exception:
+            logger.exception("Could not summarize %s %s; skipping." % (field, item.pk))
+            continue
+        summaries.append(MoneySummary(summary=json.dumps(summary), **{field: item}))
+    return summaries
+
+
+@transaction.atomic
+def refresh_money_summaries():
+    """Recomputes the stored summaries of all ballots and beneficiaries."""
+    summaries = summarize_each(Ballot.objects.all(), summarize_ballot, 'ballot')
+    summaries += summarize_each(Beneficiary.objects.exclude(locality=None),
+                                summarize_beneficiary, 'beneficiary')
+
+    MoneySummary.objects.all().delete()
+    MoneySummary.objects.bulk_create(summaries)
+    return len(summaries)
@@ -33,4 +33,4 @@ class IndependentMoneyFactory(DjangoModelFactory):
     benefactor_zip = factory.SubFactory(ZipCodeFactory)
     report_date = factory.Faker('date_time')
     source = 'NF'
-    source_xact_id = '1234'
+    source_xact_id = factory.Sequence(lambda n: '%d' % (1234 + n))
@@ -1,7 +1,12 @@
+import json
+from datetime import date
+
 from django.core.urlresolvers import reverse
 from rest_framework.test import APITestCase
 
+from _django_utils import pagination
 from finance.models import IndependentMoney
+from finance.tests.factory import BeneficiaryFactory, IndependentMoneyFactory
 from finance.tests.utils import with_form460A_data
 
 
@@ -22,3 +27,62 @@ class ContributionsAPITests(APITestCase):
         committee_url = reverse('contributions_list', kwargs={'committee_id': self.committee.id})
         resp = self.client.get(committee_url)
         self.assertIn('amount', resp.data[0], resp.data)
+
+
+class ContributionsPagingTests(APITestCase):
+    def setUp(self):
+        self.beneficiary = BeneficiaryFactory(name='Yes on A', type='PF')
+        for mi in range(7):  # some on the same day
+            IndependentMoneyFactory(amount=mi, beneficiary=self.beneficiary,
+                                    report_date=date(2016, 1, 1 + mi // 2))
+        IndependentMoneyFactory(amount=100.)  # to another beneficiary
+        self.url = reverse('contributions_received_list',
+                           kwargs={'committee_id': self.beneficiary.id})
+        self.ids = list(IndependentMoney.objects
+                        .filter(beneficiary=self.beneficiary)
+                        .order_by('-report_date', '-id')
+                        .values_list('id', flat=True))
+
+    def test_unpaged(self):
+        self.assertEqual(sorted(self.ids),
+                         sorted(row['id'] for row in self.client.get(self.url).data))
+
+    def test_pages(self):
+        ids, url = [], self.url + '?page_size=3'
+        while url:
+            data = self.client.get(url).data
+            self.assertTrue(len(data['results']) <= 3)
+            ids += [row['id'] for row in data['results']]
+            url = data['next']
+        self.assertEqual(self.ids, ids)
+
+    def test_invalid_requests(self):
+        self.assertEqual(404, self.client.get(self.url + '?cursor=xyz').status_code)
+        self.assertEqual(400, self.client.get(self.url + '?page_size=0').status_code)
+        self.assertEqual(400, self.client.get(self.url + '?stream=xml').status_code)
+
+    def test_stream(self):
+        resp = self.client.get(self.url + '?stream=json')
+        self.assertTrue(resp.streaming)
+        self.assertEqual(self.ids, [row['id'] for row in
+                                    json.loads(''.join(resp.streaming_content))])
+
+        resp = self.client.get(self.url + '?stream=ndjson')
+        self.assertEqual(self.ids, [json.loads(line)['id'] for line in
+                                    ''.join(resp.streaming_content).splitlines()])
+
+        IndependentMoney.objects.all().delete()
+        resp = self.client.get(self.url + '?stream=json')
+        self.assertEqual([], json.loads(''.join(resp.streaming_content)))
+
+    def test_stream_pages(self):
+        page_size, pagination.STREAM_PAGE_SIZE = pagination.STREAM_PAGE_SIZE, 2
+        try:
+            for num_rows in (7, 6):  # (the last page full, or not)
+                IndependentMoney.objects.filter(id__in=self.ids[num_rows:]).delete()
+                resp = self.client.get(self.url + '?stream=ndjson')
+                self.assertEqual(self.ids[:num_rows], [
+                    json.loads(line)['id']
+                    for line in ''.join(resp.streaming_content).splitlines()])
+        finally:
+            pagination.STREAM_PAGE_SIZE = page_size
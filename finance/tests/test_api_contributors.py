@@ -1,8 +1,13 @@
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase
 
-from finance.models import IndependentMoney
-
+from ballot.tests.factory import CityFactory, CountyFactory, StateFactory
+from finance.models import (Benefactor, CommitteeBenefactor, IndependentMoney,
+                            OtherBenefactor, PersonBenefactor)
+from finance.tests.factory import (BenefactorFactory, BeneficiaryFactory,
+                                   IndependentMoneyFactory)
 from finance.tests.utils import with_form460A_data
 
 
@@ -36,3 +41,59 @@ class ContributorsAPITests(APITestCase):
         # TODO: replace dummy tests with live data tests.
         self.assertIn('contribution_by_type', resp.data)
         self.assertIn('contribution_by_area', resp.data)
+
+
+class ContributorsQueryTests(APITestCase):
+    def setUp(self):
+        self.city = CityFactory(name='Oakland', state=StateFactory(short_name='CA'))
+        self.beneficiary = BeneficiaryFactory(name='Yes on A', type='PF',
+                                              locality=self.city)
+        self.url = reverse('contributors_list',
+                           kwargs={'committee_id': self.beneficiary.id})
+
+    def add_contributors(self, num):
+        for bi in range(num):
+            county = CountyFactory(name='County %d' % bi, state=self.city.state)
+            for benefactor in (
+                    PersonBenefactor.objects.create(
+                        first_name='Jane', last_name='Doe %d' % bi,
+                        benefactor_locality=CityFactory(name='City %d' % bi,
+                                                        state=self.city.state)),
+                    OtherBenefactor.objects.create(name='Other %d' % bi,
+                                                   locality=county),
+                    CommitteeBenefactor.objects.create(name='Committee %d' % bi,
+                                                       type='PF', locality=self.city),
+                    BenefactorFactory(benefactor_type='OT', benefactor_locality=None)):
+                for amount in (1., 10.):
+                    IndependentMoneyFactory(amount=amount + bi,
+                                            beneficiary=self.beneficiary,
+                                            benefactor=benefactor)
+                IndependentMoneyFactory(amount=100., benefactor=benefactor)
+
+    def test_contributors(self):
+        self.add_contributors(2)
+        resp = self.client.get(self.url)
+        self.assertEqual(8, len(resp.data))
+
+        # Same as looking up each benefactor on its own.
+        for row in resp.data:
+            self.assertEqual(set(['benefactor_id', 'benefactor_locality', 'benefactor_type',
+                                  'contributions', 'name', 'total_contributions']),
+                             set(row))
+            benefactor = Benefactor.objects.get(benefactor_id=row['benefactor_id'])
+            self.assertEqual(unicode(benefactor), row['name'])
+            self.assertEqual(benefactor.get_contributions(beneficiary=self.beneficiary),
+                             row['contributions'])
+            self.assertEqual(benefactor.get_contributions(), row['total_contributions'])
+            self.assertEqual(benefactor.get_benefactor_type_display(),
+                             row['benefactor_type'])
+            self.assertEqual(getattr(benefactor.benefactor_locality, 'name', None),
+                             row['benefactor_locality'])
+
+    def test_constant_queries(self):
+        self.add_contributors(1)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(self.url)
+        self.add_contributors(5)
+        with self.assertNumQueries(len(few.captured_queries)):
+            self.assertEqual(24, len(self.client.get(self.url).data))
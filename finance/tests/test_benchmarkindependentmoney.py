@@ -0,0 +1,20 @@
+from StringIO import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from finance.management.commands.benchmarkindependentmoney import SCRATCH_TABLE
+
+
+class BenchmarkIndependentMoneyTest(TestCase):
+    def test_benchmark(self):
+        out = StringIO()
+        call_command('benchmarkindependentmoney', rows=1000, lookups=2,
+                     beneficiaries=10, verbosity=0, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(4, len(lines))  # header, then a line per lookup
+        self.assertTrue(lines[1].startswith('by transaction'))
+
+        # The scratch table is gone.
+        self.assertNotIn(SCRATCH_TABLE, connection.introspection.table_names())
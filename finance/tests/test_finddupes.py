@@ -0,0 +1,84 @@
+import csv
+import os
+import tempfile
+from StringIO import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from finance.models import Employer, PersonBenefactor
+from generic_dedupe.models import DedupeLogEntry
+from locality.models import City, State, ZipCode
+
+
+class FindDupesTest(TestCase):
+    def setUp(self):
+        self.state = State.objects.create(name='California', short_name='CA')
+        self.cities = [City.objects.create(name=name, state=self.state)
+                       for name in ('San Diego', 'San Diego Ca', 'Oakland', 'Berkeley')]
+        zip_code = ZipCode.objects.create(short_name='92101', state=self.state)
+        self.people = [
+            PersonBenefactor.objects.create(first_name=first, last_name=last,
+                                            zip_code=zip_code)
+            for first, last in (('Ann', 'Smith'), ('Anne', 'Smith'), ('Bob', 'Smith'))]
+        for name in ('Acme Corp', 'Acme Corp.', 'Widgets Inc'):
+            Employer.objects.create(name=name)
+
+    def find_dupes(self, **kwargs):
+        out = StringIO()
+        call_command('finddupes', verbosity=0, stdout=out, **kwargs)
+        return list(csv.DictReader(StringIO(out.getvalue())))
+
+    def test_suggestions(self):
+        rows = self.find_dupes()
+        employers = list(Employer.objects.order_by('pk'))
+        self.assertEqual(
+            set([('PersonBenefactor', self.people[0].pk, self.people[0].pk),
+                 ('PersonBenefactor', self.people[0].pk, self.people[1].pk),
+                 ('Employer', employers[0].pk, employers[0].pk),
+                 ('Employer', employers[0].pk, employers[1].pk),
+                 ('City', self.cities[0].pk, self.cities[0].pk),
+                 ('City', self.cities[0].pk, self.cities[1].pk)]),
+            set([(row['model'], int(row['true_id']), int(row['id'])) for row in rows]))
+        self.assertEqual(['1.000', '1.000'],
+                         [row['score'] for row in rows if row['model'] == 'Employer'])
+
+        self.assertEqual(set(['City']),
+                         set([row['model'] for row in self.find_dupes(models='City')]))
+
+    def test_apply(self):
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        os.close(fd)
+        try:
+            call_command('finddupes', verbosity=0, output=path)
+            call_command('finddupes', verbosity=0, apply=path, stderr=StringIO())
+        finally:
+            os.remove(path)
+
+        self.assertEqual(self.cities[0].pk,
+                         City.objects.get(pk=self.cities[1].pk).true_model_id)
+        self.assertEqual(3, City.filtered_objects.count())
+        self.assertEqual(3, PersonBenefactor.objects.count())  # (can't be deduped)
+
+    def test_apply_to_deduped(self):
+        zip_code = ZipCode.objects.create(short_name='92102', state=self.state,
+                                          city=self.cities[1])
+        self.cities[1].true_model_id = self.cities[2].id
+        self.cities[1].save()
+        self.assertEqual(self.cities[2].id, ZipCode.objects.get(id=zip_code.id).city_id)
+
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w') as fp:
+            writer = csv.writer(fp)
+            writer.writerow(('model', 'true_id', 'id'))
+            writer.writerow(('City', self.cities[0].id, self.cities[1].id))
+        try:
+            call_command('finddupes', verbosity=0, apply=path)
+        finally:
+            os.remove(path)
+
+        self.assertEqual(self.cities[0].pk,
+                         City.objects.get(pk=self.cities[1].pk).true_model_id)
+        self.assertEqual(self.cities[0].id, ZipCode.objects.get(id=zip_code.id).city_id)
+        self.assertEqual([self.cities[0].id], list(DedupeLogEntry.objects.values_list(
+            'true_model_id', flat=True)))
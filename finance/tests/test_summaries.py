@@ -0,0 +1,123 @@
+from django.contrib.admin.models import CHANGE, LogEntry
+from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse
+from rest_framework.test import APITestCase
+
+from ballot.tests.factory import (CityFactory, ReferendumSelectionFactory,
+                                  StateFactory)
+from finance.models import Beneficiary, IndependentMoney, MoneySummary
+from finance.summaries import (get_ballot_summary, get_beneficiary_summary,
+                               refresh_money_summaries, summarize_ballot,
+                               summarize_beneficiary, summarize_money)
+from finance.tests.factory import (BenefactorFactory, BeneficiaryFactory,
+                                   IndependentMoneyFactory)
+from generic_dedupe.signals import dedupe_applied
+
+
+class MoneySummaryTests(APITestCase):
+    def setUp(self):
+        self.city = CityFactory(name='Oakland')
+        selection = ReferendumSelectionFactory(
+            ballot_item__ballot__locality=self.city)
+        self.ballot = selection.ballot_item.ballot
+        self.beneficiary = Beneficiary.objects.get(id=BeneficiaryFactory(
+            name='Yes on A', type='PF', locality=self.city,
+            ballot_item_selection=selection).id)
+
+        localities = (
+            self.city, CityFactory(name='Fresno', state=self.city.state),
+            CityFactory(name='Reno', state=StateFactory(short_name='NV')), None)
+        for ai, (benefactor_type, locality) in enumerate(zip(
+                ('IN', 'OT', 'PF', 'IN'), localities)):
+            IndependentMoneyFactory(
+                amount=10. ** ai, beneficiary=self.beneficiary,
+                benefactor=BenefactorFactory(benefactor_type=benefactor_type,
+                                             benefactor_locality=locality))
+
+    def test_summarize_money(self):
+        # Two more contributions of each type, from different dates.
+        for benefactor_type in ('IN', 'OT', 'PF'):
+            for _ in range(2):
+                IndependentMoneyFactory(
+                    amount=0.5, beneficiary=self.beneficiary,
+                    benefactor=BenefactorFactory(benefactor_type=benefactor_type,
+                                                 benefactor_locality=self.city))
+        benefits = IndependentMoney.objects.filter(beneficiary=self.beneficiary)
+        with self.assertNumQueries(1):
+            summary = summarize_money(self.city, benefits)
+
+        self.assertEqual(10, summary['contribution_count'])
+        self.assertEqual(1114., summary['contribution_total'])
+        self.assertEqual(
+            {'individual': 1002., 'other': 11., 'recipient_committee': 101.},
+            summary['contribution_by_type'])
+        self.assertEqual(
+            {'unknown_location': 1000., 'inside_location': 4.,
+             'inside_state': 14., 'outside_state': 100.},
+            summary['contribution_by_area'])
+
+        with self.assertNumQueries(1):
+            summary = summarize_money(self.city, benefits.filter(amount__lt=0))
+        self.assertEqual((0, None), (summary['contribution_count'],
+                                     summary['contribution_total']))
+
+    def test_stored_summaries(self):
+        ballot_summary = summarize_ballot(self.ballot)
+        beneficiary_summary = summarize_beneficiary(self.beneficiary)
+        self.assertEqual(1111., ballot_summary['contribution_total'])
+        self.assertEqual(
+            {'unknown_location': 1000., 'inside_location': 1.,
+             'inside_state': 11., 'outside_state': 100.},
+            ballot_summary['contribution_by_area'])
+
+        self.assertEqual(2, refresh_money_summaries())
+        self.assertEqual(2, MoneySummary.objects.count())
+        with self.assertNumQueries(1):
+            self.assertEqual(ballot_summary, get_ballot_summary(self.ballot))
+        with self.assertNumQueries(1):
+            self.assertEqual(beneficiary_summary,
+                             get_beneficiary_summary(self.beneficiary))
+
+        # Refreshing replaces the old summaries.
+        IndependentMoneyFactory(amount=10000., beneficiary=self.beneficiary,
+                                benefactor=BenefactorFactory(benefactor_type='IN'))
+        self.assertEqual(2, refresh_money_summaries())
+        self.assertEqual(11111., get_ballot_summary(self.ballot)['contribution_total'])
+
+    def test_unsummarizable_items_skipped(self):
+        # A statewide ballot, with money from a benefactor of an unknown type.
+        selection = ReferendumSelectionFactory(
+            ballot_item__ballot__locality=self.city.state)
+        beneficiary = BeneficiaryFactory(
+            name='No on 1', type='PF', locality=self.city,
+            ballot_item_selection=selection)
+        for benefactor_type in ('IN', 'XX'):
+            IndependentMoneyFactory(
+                beneficiary=beneficiary,
+                benefactor=BenefactorFactory(benefactor_type=benefactor_type,
+                                             benefactor_locality=self.city))
+        self.assertEqual(2, refresh_money_summaries())
+        self.assertEqual(set([self.ballot.id, None]),
+                         set(MoneySummary.objects.values_list('ballot_id', flat=True)))
+
+    def test_changes_clear_summaries(self):
+        user = User.objects.create(username='admin')
+        refresh_money_summaries()
+        LogEntry.objects.log_action(user.id, None, self.city.id, 'Oakland', CHANGE)
+        self.assertFalse(MoneySummary.objects.exists())
+
+        refresh_money_summaries()
+        dedupe_applied.send(sender=Beneficiary, instance_id=1, true_model_id=2)
+        self.assertFalse(MoneySummary.objects.exists())
+        self.assertEqual(1111., get_ballot_summary(self.ballot)['contribution_total'])
+
+    def test_summary_views(self):
+        ballot_url = reverse('locality_disclosure_summary',
+                             kwargs={'ballot_id': self.ballot.id})
+        summary_url = reverse('contributors_summary',
+                              kwargs={'committee_id': self.beneficiary.id})
+        fresh = [self.client.get(ballot_url).data, self.client.get(summary_url).data]
+
+        refresh_money_summaries()
+        self.assertEqual(fresh, [self.client.get(ballot_url).data,
+                                 self.client.get(summary_url).data])
@@ -1,14 +1,32 @@
+import json
 import os.path as op
+import shutil
+import tempfile
+from unittest import skipUnless
 
-from django.test import TestCase
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import TestCase, TransactionTestCase
 
 import numpy as np
 import pandas as pd
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
 
+from _django_utils.models import DataVersion
 from ballot.models import Party
+from finance.management.commands import xformnetfilerawdata
 from finance.management.commands.xformnetfilerawdata import (
-    clean_city, clean_name, clean_state, clean_zip, isnan, isnone,
-    parse_benefactor)
+    Command, DimensionCache, LoadErrorLog, LoadProfile, clean_city, clean_form_data,
+    clean_name, clean_state, clean_zip, clear_load_errors, find_loaded_xacts,
+    isnan, isnone, load_form_data, parse_benefactor, prime_dimension_cache,
+    read_form_csv, read_form_parquet, split_by_agency)
+from finance import models
+from finance.models import IndependentMoney, LoadError
+from locality.models import City, State
+from netfile_raw.management.commands import downloadnetfilerawdata
 
 
 class XformNetfileRawDataUnitTest(TestCase):
@@ -55,6 +73,59 @@ class XformNetfileRawDataUnitTest(TestCase):
         self.assertEqual(clean_zip('12345-6789'), '12345')
         self.assertEqual(clean_zip(12345), '12345')
 
+    def test_clean_form_data(self):
+        """Test clean_form_data matches the row-level functions."""
+        data = pd.DataFrame({
+            'tran_City': ['ALAMEDA, CA', '  san  diego ', '   ', 'None', np.nan],
+            'tran_ST': [' ca', 'CA', '', 'None', np.nan],
+            'tran_Zip4': ['92110-0123, CA', ' 94612', 12345, 'None', np.nan],
+            'tran_NamL': ['BEN CIP', "o'BRIEN  jr", ' ', 'None', np.nan]})
+        cleaned = clean_form_data(data)
+        for col, clean_fn in (('tran_City', clean_city), ('tran_ST', clean_state),
+                              ('tran_Zip4', clean_zip), ('tran_NamL', clean_name)):
+            for raw, val in zip(data[col], cleaned[col]):
+                if isinstance(raw, basestring) and raw == 'None' or isnan(raw):
+                    self.assertTrue(raw is val or raw == val)
+                else:
+                    self.assertEqual(clean_fn(raw), val)
+                    self.assertEqual(clean_fn(val), val)
+
+    def test_clear_failed_again(self):
+        def log_errors(xact_ids):
+            LoadError.objects.bulk_create([
+                LoadError(source='NF', source_xact_id=xact_id, form_type='A',
+                          error_type='ValueError', row='{}')
+                for xact_id in xact_ids])
+            return LoadError.objects.order_by('-id')[0].id
+
+        last_id = log_errors(['a', 'b', 'c', 'd', 'e'])
+        log_errors(['e', 'c', 'a'])
+        clear_load_errors(last_id, batch_size=2)
+        self.assertEqual(['b', 'd'], sorted(LoadError.objects.filter(id__lte=last_id)
+                                            .values_list('source_xact_id', flat=True)))
+        self.assertEqual(3, LoadError.objects.filter(id__gt=last_id).count())
+
+    def test_split_by_agency(self):
+        data = pd.DataFrame({
+            'agency_shortcut': ['A1', 'A2', 'A3', 'A4', 'A5', 'A5', 'A6', 'A7', 'A8'],
+            'form_Type': ['A', 'A', 'A', 'A', 'A', 'A', 'A', 'D', 'D'],
+            'filerName': ['Yes On X', 'YES ON X', 'Yes On Y', 'Yes On Z', 'No On W',
+                          'No On W', 'No On V', 'Yes On U', 'No On T'],
+            'entity_Cd': ['OTH', 'OTH', 'IND', 'IND', 'IND', 'COM', 'COM', 'COM', 'COM'],
+            'tran_NamL': ['Acme', 'Widgets', 'Smith', 'SMITH', 'Smith', np.nan,
+                          'Friends of V', 'Friends of U', 'Friends of T'],
+            'tran_NamF': [np.nan, np.nan, 'Ann', 'Ann', 'Bob'] + [np.nan] * 4,
+            'cand_NamL': [np.nan] * 9,
+            # The same committee, by filer ID: as a contributor (to A6), and
+            # as the filer of a form D (in A8).
+            'cmte_Id': [np.nan] * 6 + ['C1234567', np.nan, np.nan],
+            'filerId': [np.nan] * 7 + ['7654321', '1234567']})
+        partitions = split_by_agency(data)
+        self.assertEqual(
+            set([('A1', 'A2'), ('A3', 'A4'), ('A5',), ('A6', 'A8'), ('A7',)]),
+            set([tuple(sorted(part['agency_shortcut'].unique())) for part in partitions]))
+        self.assertEqual(len(data), sum([len(part) for part in partitions]))
+
 
 class XformNetfileRawDataPTYTest(TestCase):
     @classmethod
@@ -68,8 +139,266 @@ class XformNetfileRawDataPTYTest(TestCase):
             op.dirname(__file__), 'data', 'test_PTY.csv')
 
     def test_PTY(self):
-        self.data = pd.read_csv(self.PTY_CSV_FILE)
+        self.data = clean_form_data(pd.read_csv(self.PTY_CSV_FILE))
         row = self.data.iloc[0]
         benefactor, _ = parse_benefactor(row)
         self.assertEqual(benefactor.benefactor_type, 'PY')
         self.assertEqual(Party.objects.all().count(), 1)
+
+
+class XformNetfileRawDataLoadTest(TestCase):
+    """Loads the San Diego test data through load_form_data."""
+    FORM_TYPES = ('A', 'C', 'D', 'F497P1')
+
+    @classmethod
+    def setUpClass(cls):
+        super(XformNetfileRawDataLoadTest, cls).setUpClass()
+        cls.csv_path = op.join(op.dirname(__file__), 'data', 'test_CSD.csv')
+        cls.data = pd.read_csv(cls.csv_path)
+        cls.agency = {'id': 1, 'name': 'San Diego', 'shortcut': 'CSD'}
+
+    def load(self, chunks=None, **kwargs):
+        error_rows = []
+        for data in chunks or [self.data]:
+            for form_type in self.FORM_TYPES:
+                error_rows += load_form_data(
+                    data=data, agency_fn=lambda row: dict(self.agency),
+                    form_name=form_type, form_type=form_type, verbosity=0,
+                    **kwargs)
+        return error_rows
+
+    def snapshot(self, **kwargs):
+        """Load the data, and summarize what got loaded (then roll back)."""
+        sid = transaction.savepoint()
+        error_rows = self.load(**kwargs)
+        snapshot = sorted([
+            (m.source_xact_id, m.amount, m.cumulative_amount, m.report_date,
+             unicode(m.benefactor), unicode(m.benefactor_zip),
+             m.beneficiary.name, m.beneficiary.support,
+             unicode(m.beneficiary.ballot_item_selection))
+            for m in IndependentMoney.objects.all()])
+        transaction.savepoint_rollback(sid)
+        return snapshot, len(error_rows)
+
+    def test_batch_matches_row_by_row(self):
+        rows, row_errors = self.snapshot()
+        self.assertGreater(len(rows), 0)
+        for batch_size in (1, 7, 1000):
+            batched, batch_errors = self.snapshot(batch_size=batch_size)
+            self.assertEqual(rows, batched, batch_size)
+            self.assertEqual(row_errors, batch_errors, batch_size)
+
+    def test_batch_reload_skips_loaded_rows(self):
+        self.load(batch_size=10)
+        count = IndependentMoney.objects.count()
+        self.load(batch_size=10)
+        self.assertEqual(count, IndependentMoney.objects.count())
+        self.load(batch_size=10, force=True)
+        self.assertEqual(count, IndependentMoney.objects.count())
+
+    def test_reload_reads_loaded_rows_once(self):
+        self.load()
+        loaded_xacts = find_loaded_xacts()
+        self.assertEqual(IndependentMoney.objects.count(), len(loaded_xacts))
+        with self.assertNumQueries(0):
+            self.assertEqual([], self.load(loaded_xacts=loaded_xacts))
+        with self.assertNumQueries(len(self.FORM_TYPES)):
+            self.load(batch_size=10)
+
+    def test_force_reload_updates_rows(self):
+        self.load()
+        count = IndependentMoney.objects.count()
+        money = IndependentMoney.objects.all()[0]
+        IndependentMoney.objects.filter(id=money.id).update(amount=money.amount + 1)
+
+        self.load(force=True)
+        self.assertEqual(count, IndependentMoney.objects.count())
+        self.assertEqual(money.amount, IndependentMoney.objects.get(id=money.id).amount)
+
+    def test_cache_matches_uncached(self):
+        rows, row_errors = self.snapshot()
+        for batch_size in (None, 7):
+            cache = DimensionCache()
+            cached, cache_errors = self.snapshot(batch_size=batch_size, cache=cache)
+            self.assertEqual(rows, cached, batch_size)
+            self.assertEqual(row_errors, cache_errors, batch_size)
+            self.assertGreater(cache.hits['City'], 0)
+
+            # Ballot info is worked out once per filer.
+            self.assertGreater(cache.hits['BallotItemSelection'], 0)
+            self.assertLessEqual(cache.misses['BallotItemSelection'],
+                                 self.data['filerName'].nunique())
+
+    def test_cache_discards_rolled_back_rows(self):
+        cache = DimensionCache()
+        try:
+            with cache.discard_on_error(), transaction.atomic():
+                cache.get_or_create(State, short_name='ZZ')
+                raise ValueError()
+        except ValueError:
+            pass
+        self.assertFalse(State.objects.filter(short_name='ZZ').exists())
+        state = cache.get_or_create(State, short_name='ZZ')
+        self.assertIsNotNone(State.objects.get(pk=state.pk))
+        self.assertEqual(cache.misses['State'], 2)
+
+    def test_load_uses_true_cities(self):
+        state = State.objects.create(short_name='CA', name='California')
+        city = City.objects.create(name='City of San Diego', state=state)
+        duplicate = City.objects.create(name=self.agency['name'], state=state,
+                                        true_model_id=city.id)
+        for cache in (None, DimensionCache()):
+            self.load(cache=cache)
+            self.assertEqual(set([city.id]), set(models.Beneficiary.objects
+                                                 .values_list('locality_id', flat=True)))
+            self.assertFalse(models.Beneficiary.objects.filter(locality=duplicate).exists())
+            self.assertEqual(1, City.objects.filter(name=self.agency['name']).count())
+
+    def test_error_log(self):
+        data = self.data.copy()
+        ri = data.index[data['form_Type'] == 'A'][0]
+        data.loc[ri, 'tran_Amt1'] = 'bad'
+        error_log = LoadErrorLog(batch_size=1)
+        self.assertEqual([], self.load(chunks=[data], error_log=error_log))
+
+        error = LoadError.objects.get()
+        self.assertEqual(1, error_log.num_errors)
+        self.assertEqual((data.loc[ri, 'netFileKey'], 'A', 'ValueError'),
+                         (error.source_xact_id, error.form_type, error.error_type))
+        self.assertEqual('bad', json.loads(error.row)['tran_Amt1'])
+
+        # Once the row loads, its error is cleared.
+        self.load()
+        clear_load_errors(error.id)
+        self.assertFalse(LoadError.objects.exists())
+
+    def test_error_log_keyless_row(self):
+        error_log = LoadErrorLog()
+        error_log.add([(0, {'tran_Amt1': 'bad'}, {'tran_Amt1': 'bad'}, ValueError('bad'))])
+        error_log.flush()
+
+        error = LoadError.objects.get()
+        self.assertEqual(('', '', 'ValueError'),
+                         (error.source_xact_id, error.form_type, error.error_type))
+
+    def test_failed_load_bumps_data_version(self):
+        def refresh_money_summaries():
+            raise ValueError('refresh failed')
+        command = Command()
+        command.verbosity, command.profile_path = 0, None
+        command.parquet, command.combined_csv_path = False, self.csv_path
+        command.chunk_size, command.retry_errors = None, True  # (no errors: no rows)
+
+        DataVersion.objects.all().delete()
+        refresh, xformnetfilerawdata.refresh_money_summaries = (
+            xformnetfilerawdata.refresh_money_summaries, refresh_money_summaries)
+        try:
+            self.assertRaises(ValueError, command.load)
+        finally:
+            xformnetfilerawdata.refresh_money_summaries = refresh
+        self.assertEqual(1, DataVersion.get_current().version)
+
+    def test_profile(self):
+        profile = LoadProfile()
+        profile.start()
+        xformnetfilerawdata._profile = profile
+        try:
+            profile.form_type = 'A'
+            with profile.stage('read'):
+                self.load(batch_size=7)
+        finally:
+            xformnetfilerawdata._profile = None
+            profile.stop()
+
+        stats = profile.report()['stages']
+        self.assertEqual(set(['read', 'clean', 'benefactor', 'beneficiary', 'ballot', 'money']),
+                         set([stat['stage'] for stat in stats]))
+        self.assertEqual(set(['A']), set([stat['form_type'] for stat in stats]))
+        self.assertIn('CSD', [stat['agency'] for stat in stats])
+        self.assertGreater(sum([stat['queries'] for stat in stats]), 0)
+        self.assertTrue(profile.summary().startswith('Load profile'))
+
+    def test_read_csv_matches_default_read(self):
+        rows, row_errors = self.snapshot()
+        for chunk_size in (None, 25):
+            chunks = list(read_form_csv(self.csv_path, chunk_size=chunk_size))
+            self.assertEqual(len(self.data), sum([len(c) for c in chunks]))
+            read, read_errors = self.snapshot(chunks=chunks)
+            self.assertEqual(rows, read, chunk_size)
+            self.assertEqual(row_errors, read_errors, chunk_size)
+
+    def test_primed_cache_has_no_misses(self):
+        cache = DimensionCache()
+        prime_dimension_cache(self.data.assign(agency_shortcut='CSD'), cache=cache,
+                              agency_fn=lambda row: dict(self.agency))
+        cache.misses.clear()
+        self.load(cache=cache)
+        del cache.misses['BallotItemSelection']  # not primed
+        self.assertEqual(sum(cache.misses.values()), 0, cache.misses)
+        self.assertGreater(sum(cache.hits.values()), 0)
+
+    @skipUnless(pyarrow, "pyarrow is not installed")
+    def test_read_parquet_matches_default_read(self):
+        command = downloadnetfilerawdata.Command()
+        command.verbosity, command.gzip = 0, False
+        command.agencies, command.years = ['CSD', 'COAK'], ['2015', '2016']
+        command.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, command.data_dir)
+        command.combined_parquet_path = op.join(
+            command.data_dir, 'netfile_cal201_transaction.parquet')
+        for year in command.years:
+            shutil.copy(self.csv_path, command.get_agency_year_csv_path('CSD', year))
+        command.combine_parquet()
+
+        rows, row_errors = self.snapshot()
+        chunks = list(read_form_parquet(
+            command.combined_parquet_path, partitions=['CSD_2016', 'COAK_2016']))
+        self.assertEqual(1, len(chunks))
+        self.assertEqual(len(self.data), len(chunks[0]))
+        self.assertEqual(['CSD'], list(chunks[0]['agency_shortcut'].unique()))
+        read, read_errors = self.snapshot(chunks=chunks)
+        self.assertEqual(rows, read)
+        self.assertEqual(row_errors, read_errors)
+
+
+class XformNetfileRawDataParallelTest(TransactionTestCase):
+    """Loads chunks through the --workers pool."""
+    def setUp(self):
+        if connection.vendor == 'sqlite' and \
+                connection.is_in_memory_db(connection.settings_dict['NAME']):
+            self.skipTest("worker processes can't share an in-memory database")
+
+        data = pd.read_csv(op.join(op.dirname(__file__), 'data', 'test_CSD.csv'))
+        filer_names = sorted(data['filerName'].dropna().unique())
+        data['agency_shortcut'] = data['filerName'].map(
+            lambda name: 'COAK' if filer_names.index(name) % 2 else 'CSD')
+        self.data = data
+
+        command = self.command = Command()
+        command.verbosity, command.force, command.workers = 0, False, 2
+        command.forms, command.batch_size = Command.FORM_TYPES, None
+        command.agencies_metadata = [
+            {'id': 1, 'name': 'San Diego, City of', 'shortcut': 'CSD'},
+            {'id': 2, 'name': 'Oakland, City of', 'shortcut': 'COAK'}]
+        command.cache, command.error_log = DimensionCache(), LoadErrorLog()
+        command.loaded_xacts = find_loaded_xacts()
+
+    def test_overlapping_chunks(self):
+        self.command.load_chunk_in_parallel(self.data[:120])
+        self.command.load_chunk_in_parallel(self.data[80:])
+        self.assertEqual(0, self.command.error_log.num_errors)
+        self.assertEqual(find_loaded_xacts(), self.command.loaded_xacts)
+        self.assertGreater(self.command.cache.hits['BallotItemSelection'], 0)
+
+        # Nothing was loaded twice, or is left to load.
+        count = IndependentMoney.objects.count()
+        self.assertEqual(count, len(self.command.loaded_xacts))
+        self.command.load_chunk(self.data)
+        self.assertEqual(count, IndependentMoney.objects.count())
+        self.assertEqual(0, self.command.error_log.num_errors)
+
+        for model, fields in ((models.Beneficiary, ('name', 'filer_id')),
+                              (models.CommitteeBenefactor, ('name',)),
+                              (models.PersonBenefactor, ('first_name', 'last_name', 'zip_code'))):
+            self.assertFalse(model.objects.values(*fields).annotate(num=Count('pk'))
+                             .filter(num__gt=1).exists(), model)
@@ -1,4 +1,3 @@
-from django.db.models import F, Sum
 from django.shortcuts import get_object_or_404
 
 from rest_framework import viewsets
@@ -6,9 +5,33 @@ from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.decorators import detail_route, list_route
 
-from .models import Benefactor, Beneficiary, Committee, IndependentMoney
+from .models import Beneficiary, Committee, IndependentMoney
 from .serializers import BenefactorSerializer, CommitteeSerializer, IndependentMoneySerializer
-from _django_utils.serializers import as_money
+from .summaries import get_beneficiary_summary
+from _django_utils.pagination import KeysetPagination, stream_response
+
+# Newest first; id makes the order unique (for paging).
+MONEY_ORDERING = ('-report_date', '-id')
+
+
+def list_money(request, benefits):
+    """
+    Serialized benefits: all at once, by page (given a page_size
+    or cursor), or streamed (given stream=json or stream=ndjson).
+    """
+    benefits = benefits.select_related('benefactor', 'beneficiary')
+    stream_format = request.query_params.get('stream')
+    if stream_format:
+        return stream_response(benefits, MONEY_ORDERING,
+                               IndependentMoneySerializer, stream_format)
+
+    if KeysetPagination.is_requested(request):
+        paginator = KeysetPagination(ordering=MONEY_ORDERING)
+        page = paginator.paginate_queryset(benefits, request)
+        return paginator.get_paginated_response(
+            IndependentMoneySerializer(page, many=True).data)
+
+    return Response(IndependentMoneySerializer(benefits, many=True).data)
 
 
 class CommitteeViewSet(viewsets.ViewSet):
@@ -38,52 +61,26 @@ class BenefactorViewSet(viewsets.ViewSet):
 
     @list_route(['GET'])
     def contributions(self, request, committee_id):
-        """List all contributions made"""
+        """
+        List all contributions made
+        ---
+        parameters:
+          - name: page_size
+            description: Page through the results, this many at a time (newest first)
+            type: integer
+            paramType: query
+          - name: cursor
+            description: Where the next page starts (from the previous page)
+            type: string
+            paramType: query
+          - name: stream
+            description: Stream all results as json, or ndjson (newline-delimited)
+            type: string
+            paramType: query
+        """
         obj = IndependentMoney.objects.filter(
             benefactor__committeebenefactor__id=committee_id)
-        return Response(IndependentMoneySerializer(obj, many=True).data)
-
-
-def summarize_money(locality, benefits):
-    # Simple measures
-    num_contributions = benefits.count()
-    total_benefits = benefits.aggregate(total=Sum(F('amount')))['total']
-
-    # Summary measures by benefactor type
-    key_map = dict(IN='individual', OT='other',
-                   PF='recipient_committee', PY='political_party',
-                   IC='independent_committee')
-    benefits_groupedby_type = benefits \
-        .values_list('benefactor__benefactor_type') \
-        .annotate(total=Sum(F('amount')))
-    benefits_by_type = dict([(key_map[vals[0]], as_money(vals[1]))  # alias keys
-                             for vals in benefits_groupedby_type])
-
-    # Summarize by locality.
-    results_by_locality = dict(
-        unknown_location=benefits
-        .filter(benefactor__benefactor_locality=None),
-        inside_location=benefits
-        .filter(benefactor__benefactor_locality=locality),
-        inside_state=benefits
-        .filter(benefactor__benefactor_locality__city__state=locality.state),
-        outside_state=benefits
-        .exclude(benefactor__benefactor_locality=None)
-        .exclude(benefactor__benefactor_locality__city__state=locality.state))
-    total_by_locality = dict(
-        [(key, as_money(val.aggregate(tot=Sum(F('amount')))['tot'] or 0))  # 0 for empty
-         for key, val in results_by_locality.items()])
-
-    return {  # done, manually
-        "location": {
-            "name": locality.name or locality.short_name,
-            "id": locality.id,
-        },
-        "contribution_total": as_money(total_benefits),
-        "contribution_count": as_money(num_contributions),
-        "contribution_by_type": benefits_by_type,
-        "contribution_by_area": total_by_locality,
-    }
+        return list_money(request, obj)
 
 
 class BeneficiaryViewSet(viewsets.ViewSet):
@@ -103,23 +100,34 @@ class BeneficiaryViewSet(viewsets.ViewSet):
     def contributors(self, request, committee_id):
         """List of all contributors to a committee."""
         beneficiary = get_object_or_404(Beneficiary, id=committee_id)
-        benefits = Benefactor.objects.filter(independentmoney__beneficiary=beneficiary)
-        # TODO: aggregate/group money benefactor
-        return Response(BenefactorSerializer(benefits, beneficiary=beneficiary, many=True).data)
+        benefactors = beneficiary.get_contributors()
+        return Response(BenefactorSerializer(benefactors, beneficiary=beneficiary, many=True).data)
 
     @list_route(['GET'])
     def contributions_received(self, request, committee_id):
-        """List of all benefits received by a committee."""
+        """
+        List of all benefits received by a committee.
+        ---
+        parameters:
+          - name: page_size
+            description: Page through the results, this many at a time (newest first)
+            type: integer
+            paramType: query
+          - name: cursor
+            description: Where the next page starts (from the previous page)
+            type: string
+            paramType: query
+          - name: stream
+            description: Stream all results as json, or ndjson (newline-delimited)
+            type: string
+            paramType: query
+        """
         beneficiary = get_object_or_404(Beneficiary, id=committee_id)
         benefits = IndependentMoney.objects.filter(beneficiary=beneficiary)
-        return Response(IndependentMoneySerializer(benefits, many=True).data)
+        return list_money(request, benefits)
 
     @detail_route(['GET'])
     def summary(self, request, committee_id):
         """Aggregate benefits, over all contributions to a committee."""
         beneficiary = get_object_or_404(Beneficiary, id=committee_id)
-        benefits = IndependentMoney.objects.filter(beneficiary=beneficiary)
-        locality = beneficiary.locality.reverse_lookup()  # upgrade
-
-        summary_dict = summarize_money(locality=locality, benefits=benefits)
-        return Response(summary_dict)
+        return Response(get_beneficiary_summary(beneficiary))
@@ -1,3 +1,4 @@
+from .canonical import CanonicalIdMap
 from .models import DedupeMixin
 from .signals import add_dedupe_signals
-__all__ = ['add_dedupe_signals', 'DedupeMixin']
+__all__ = ['add_dedupe_signals', 'CanonicalIdMap', 'DedupeMixin']
@@ -0,0 +1,127 @@
+"""
+Finds candidate duplicates among many records, for a person to
+review, without comparing every pair: records are only compared
+within blocks that share a key (e.g. last name and zip code, or one
+of their rarest name trigrams).
+"""
+import re
+from collections import Counter, defaultdict
+
+from django.utils.encoding import force_text
+
+
+def normalize(text):
+    """'  Smith-Jones, Ann ' => 'smith jones ann'"""
+    return ' '.join(re.findall(r'\w+', force_text(text or '').lower(), re.UNICODE))
+
+
+def trigrams(text):
+    """The set of (space-padded) three-letter substrings of normalized text."""
+    text = ' %s ' % normalize(text)
+    return frozenset([text[i:i + 3] for i in range(len(text) - 2)])
+
+
+def similarity(grams1, grams2):
+    """Dice similarity of two trigram sets (1.0 is identical)."""
+    if not grams1 or not grams2:
+        return 0.
+    return 2. * len(grams1 & grams2) / (len(grams1) + len(grams2))
+
+
+class DuplicateFinder(object):
+    """
+    Clusters records whose names are at least threshold similar,
+    comparing records only within blocks:
+
+    * those given as keys (e.g. ('smith', zip_code_id)), and
+    * each record's num_trigram_keys rarest shared name trigrams
+      (within its group, e.g. a state), so that rare spellings meet
+      their matches while common trigrams don't make huge blocks.
+
+    Blocks over max_block_size records are skipped (they'd be mostly
+    unrelated records), which keeps the work near-linear.
+
+    Only the names are held on to; trigrams are worked out as needed
+    (per block, when comparing).
+    """
+    def __init__(self, threshold=0.7, num_trigram_keys=2, max_block_size=100):
+        self.threshold = threshold
+        self.num_trigram_keys = num_trigram_keys
+        self.max_block_size = max_block_size
+        self.num_skipped_blocks = 0
+        self._pks = []
+        self._names = []
+        self._groups = []
+        self._keys = []
+
+    def add(self, pk, name, keys=(), group=None):
+        self._pks.append(pk)
+        self._names.append(name)
+        self._groups.append(group)
+        self._keys.append(keys)
+
+    def get_blocks(self):
+        """Lists of record indexes that share a blocking key."""
+        frequencies = Counter()
+        for group, name in zip(self._groups, self._names):
+            frequencies.update([(group, gram) for gram in trigrams(name)])
+
+        blocks = defaultdict(list)
+        for idx, (group, name, keys) in enumerate(zip(self._groups, self._names, self._keys)):
+            # (A trigram no other record has can't find a match.)
+            rarest = sorted([gram for gram in trigrams(name)
+                             if frequencies[(group, gram)] > 1],
+                            key=lambda gram: (frequencies[(group, gram)], gram))
+            for gram in rarest[:self.num_trigram_keys]:
+                blocks[('trigram', group, gram)].append(idx)
+            for key in keys:
+                blocks[('key', key)].append(idx)
+
+        for block in blocks.values():
+            if len(block) > self.max_block_size:
+                self.num_skipped_blocks += 1
+            elif len(block) > 1:
+                yield block
+
+    def find(self):
+        """
+        Clusters of similar records, as (score, [pk, ...]), best first;
+        pks are in the order they were added, and score is the mean
+        similarity of the matched pairs that joined the cluster.
+
+        Records already in the same cluster aren't compared again, so
+        the pairs compared (in any number of blocks) aren't kept.
+        """
+        parents = dict()
+
+        def find_root(idx):
+            while parents.get(idx, idx) != idx:
+                idx = parents[idx]
+            return idx
+
+        scores = dict()
+        for block in self.get_blocks():
+            grams = dict([(idx, trigrams(self._names[idx])) for idx in block])
+            for i, idx1 in enumerate(block):
+                for idx2 in block[i + 1:]:
+                    root1, root2 = find_root(idx1), find_root(idx2)
+                    if root1 == root2:
+                        continue
+                    score = similarity(grams[idx1], grams[idx2])
+                    if score < self.threshold:
+                        continue
+                    parents[max(root1, root2)] = min(root1, root2)
+                    scores[(idx1, idx2)] = score
+
+        clusters = defaultdict(list)
+        for idx in parents:
+            clusters[find_root(idx)].append(idx)
+        cluster_scores = defaultdict(list)
+        for (idx1, _), score in scores.items():
+            cluster_scores[find_root(idx1)].append(score)
+
+        return sorted([
+            (sum(cluster_scores[root]) / len(cluster_scores[root]),
+             [self._pks[idx] for idx in sorted(set(members + [root]))])
+            for root, members in clusters.items()],
+            key=lambda cluster: (-cluster[0], -len(cluster[1]), cluster[1]))
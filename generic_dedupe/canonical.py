@@ -0,0 +1,49 @@
+class CanonicalIdMap(object):
+    """
+    Maps the ids of a deduped model's rows to the ids of their true
+    (canonical) models, following dedupes of dedupes.
+
+    The map is read from the model's table on first use, and again
+    on refresh(); a load can use one map throughout, so that what it
+    creates points at true models, with no dedupe work afterwards.
+    """
+    def __init__(self, model):
+        self.model = model
+        self._true_ids = None
+
+    def refresh(self):
+        true_ids = dict(self.model._base_manager
+                        .exclude(true_model_id=None)
+                        .values_list('id', 'true_model_id'))
+        self._true_ids = dict()
+        for pk, true_id in true_ids.items():
+            seen = set([pk])
+            while true_id in true_ids and true_id not in seen:  # (guards cycles)
+                seen.add(true_id)
+                true_id = true_ids[true_id]
+            self._true_ids[pk] = true_id
+
+    def get_canonical_id(self, pk):
+        """The id of the true model for pk (pk itself, if it wasn't deduped)."""
+        if self._true_ids is None:
+            self.refresh()
+        return self._true_ids.get(pk, pk)
+
+    def canonical(self, instance):
+        """The instance's true model (the instance, if it isn't deduped)."""
+        if instance is None or instance.true_model_id is None:
+            return instance
+        return self.model._base_manager.get(
+            pk=self.get_canonical_id(instance.true_model_id))
+
+    def get_or_create(self, **kwargs):
+        """
+        Like model.objects.get_or_create, but returns true models only:
+        matches that aren't deduped come first, then the true model of
+        a deduped match; a row is only created if nothing matches.
+        """
+        matches = list(self.model._base_manager.filter(**kwargs).order_by('pk'))
+        if not matches:
+            return self.model._base_manager.create(**kwargs), True
+        true_matches = [obj for obj in matches if obj.true_model_id is None]
+        return self.canonical((true_matches or matches)[0]), False
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from generic_dedupe.signals import deduped_models, move_related
+
+
+class Command(BaseCommand):
+    help = ('Move anything related to deduped models over to their true models '
+            '(see settings.DEDUPE_IN_BACKGROUND)')
+
+    def handle(self, *args, **options):
+        verbosity = int(options['verbosity'])
+        for model in deduped_models:
+            deduped = model._base_manager \
+                .exclude(true_model_id=None) \
+                .values_list('id', 'true_model_id')
+            for instance_id, true_model_id in deduped:
+                num_moved = move_related(model, instance_id, true_model_id)
+                if verbosity and num_moved:
+                    print("Moved %d objects from %s %d to %d" % (
+                        num_moved, model.__name__, instance_id, true_model_id))
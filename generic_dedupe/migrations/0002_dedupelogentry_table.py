@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+from django.conf import settings
+import django.utils.timezone
+
+# Entries copied per query.
+BATCH_SIZE = 500
+
+ENTRY_FIELDS = (
+    'action_time', 'user_id', 'content_type_id', 'object_id', 'object_repr',
+    'action_flag', 'change_message', 'class_name', 'prop_name', 'true_model_id',
+    'old_true_model_id')
+
+
+def copy_entries(apps, schema_editor):
+    """Copies the entries out of the admin log, into their own table."""
+    LogEntry = apps.get_model('admin', 'LogEntry')
+    OldDedupeLogEntry = apps.get_model('generic_dedupe', 'OldDedupeLogEntry')
+    DedupeLogEntry = apps.get_model('generic_dedupe', 'DedupeLogEntry')
+
+    old_ids = list(OldDedupeLogEntry.objects.order_by('logentry_ptr_id')
+                                            .values_list('pk', flat=True))
+    for first in range(0, len(old_ids), BATCH_SIZE):
+        batch_ids = old_ids[first:first + BATCH_SIZE]
+        DedupeLogEntry.objects.bulk_create([
+            DedupeLogEntry(**dict(zip(ENTRY_FIELDS, values)))
+            for values in OldDedupeLogEntry.objects.filter(pk__in=batch_ids)
+                                                   .order_by('logentry_ptr_id')
+                                                   .values_list(*ENTRY_FIELDS)])
+        LogEntry.objects.filter(pk__in=batch_ids).delete()  # (and the old entries)
+
+
+def copy_entries_back(apps, schema_editor):
+    """Copies the entries back into the admin log (one by one)."""
+    LogEntry = apps.get_model('admin', 'LogEntry')
+    OldDedupeLogEntry = apps.get_model('generic_dedupe', 'OldDedupeLogEntry')
+    DedupeLogEntry = apps.get_model('generic_dedupe', 'DedupeLogEntry')
+    for values in DedupeLogEntry.objects.order_by('pk').values_list(*ENTRY_FIELDS).iterator():
+        fields = dict(zip(ENTRY_FIELDS, values))
+        entry = OldDedupeLogEntry.objects.create(**fields)
+        # (LogEntry.action_time is auto_now.)
+        LogEntry.objects.filter(pk=entry.pk).update(action_time=fields['action_time'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('admin', '0001_initial'),
+        ('generic_dedupe', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RenameModel('DedupeLogEntry', 'OldDedupeLogEntry'),
+        migrations.CreateModel(
+            name='DedupeLogEntry',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True,
+                                        primary_key=True)),
+                ('action_time', models.DateTimeField(default=django.utils.timezone.now,
+                                                     editable=False)),
+                ('object_id', models.TextField(null=True, blank=True)),
+                ('object_repr', models.CharField(max_length=200)),
+                ('action_flag', models.PositiveSmallIntegerField()),
+                ('change_message', models.TextField(blank=True)),
+                ('class_name', models.CharField(max_length=1024)),
+                ('prop_name', models.CharField(max_length=1024)),
+                ('true_model_id', models.IntegerField()),
+                ('old_true_model_id', models.IntegerField(default=None, null=True, blank=True)),
+                ('content_type', models.ForeignKey(blank=True, to='contenttypes.ContentType',
+                                                   null=True)),
+                ('user', models.ForeignKey(to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ('-action_time',),
+                'verbose_name_plural': 'dedupe log entries',
+            },
+        ),
+        migrations.RunPython(copy_entries, copy_entries_back),
+        migrations.DeleteModel('OldDedupeLogEntry'),
+    ]
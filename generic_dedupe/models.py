@@ -1,5 +1,7 @@
-from django.contrib.admin.models import LogEntry
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
 from django.db import models
+from django.utils import timezone
 from django.utils.encoding import python_2_unicode_compatible
 
 
@@ -17,29 +19,60 @@ class DedupeMixin(models.Model):
     filtered_objects = DedupeManager()
     true_model_id = models.IntegerField(default=None, blank=True, null=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remembers the loaded true_model_id, so saves can tell if it changed."""
+        instance = super(DedupeMixin, cls).from_db(db, field_names, values)
+        if 'true_model_id' in field_names:
+            instance._saved_true_model_id = instance.true_model_id
+        return instance
+
     class Meta:
         abstract = True
 
 
+class DedupeLogEntryManager(models.Manager):
+    def bulk_create(self, entries, batch_size=500):
+        """Saves the entries, with their default change messages, in a few queries."""
+        for entry in entries:
+            entry.change_message = entry.change_message or entry.get_default_change_message()
+        return super(DedupeLogEntryManager, self).bulk_create(entries, batch_size=batch_size)
+
+
 @python_2_unicode_compatible
-class DedupeLogEntry(LogEntry):
+class DedupeLogEntry(models.Model):
     """
     Log for deduped items.
 
     This is both for keeping records of what happens, as well as
     allowing us to undo deduping.
+
+    (It has the admin LogEntry's fields, but its own table, so that
+    many entries can be saved at once.)
     """
+    action_time = models.DateTimeField(default=timezone.now, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL)
+    content_type = models.ForeignKey(ContentType, blank=True, null=True)
+    object_id = models.TextField(blank=True, null=True)
+    object_repr = models.CharField(max_length=200)
+    action_flag = models.PositiveSmallIntegerField()
+    change_message = models.TextField(blank=True)
     class_name = models.CharField(max_length=1024)
     prop_name = models.CharField(max_length=1024)
     true_model_id = models.IntegerField()
     old_true_model_id = models.IntegerField(default=None, blank=True, null=True)
 
+    objects = DedupeLogEntryManager()
+
+    def get_default_change_message(self):
+        return "Changed %s.%s for %s from %d to %d" % (
+            self.class_name, self.prop_name, self.object_repr,
+            self.old_true_model_id, self.true_model_id)
+
     def save(self, *args, **kwargs):
         """Add a default meaningful change_message."""
         if not self.change_message:
-            self.change_message = "Changed %s.%s for %s from %d to %d" % (
-                self.class_name, self.prop_name, self.object_repr,
-                self.old_true_model_id, self.true_model_id)
+            self.change_message = self.get_default_change_message()
         super(DedupeLogEntry, self).save(*args, **kwargs)
 
     def __str__(self):
@@ -47,3 +80,5 @@ class DedupeLogEntry(LogEntry):
 
     class Meta:
         app_label = 'generic_dedupe'
+        ordering = ('-action_time',)
+        verbose_name_plural = 'dedupe log entries'
@@ -1,103 +1,181 @@
+import operator
+from collections import defaultdict
+
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.contrib.admin.models import ADDITION
 from django.contrib.contenttypes.models import ContentType
 from django.db import transaction
+from django.db.models import Q
 from django.db.models.signals import pre_save, post_save, pre_delete
-from django.dispatch import receiver
+from django.dispatch import Signal, receiver
+
+# Sent once the foreign keys to a deduped model have been moved.
+dedupe_applied = Signal(providing_args=['instance_id', 'true_model_id'])
+
+# Sent once they have been moved back (on reverting a dedupe).
+dedupe_reverted = Signal(providing_args=['instance_id', 'true_model_id'])
 
+# Objects moved back (and log entries deleted) per query, under parameter limits.
+REVERT_BATCH_SIZE = 500
 
-def model_and_supers(model):
-    """Return an iterator containing the model and it's superclass versions."""
-    if model is None:
-        return
-    yield model
-    for cls in model._meta.get_parent_list():
-        yield cls.objects.get(id=model.id)
+# Models set up with add_dedupe_signals.
+deduped_models = []
 
 
-def get_related_queryset(model, relationship):
-    """Drills into relationship to pull out related models."""
-    if relationship.one_to_one:
-        return []
+def get_dedupe_relationships(model):
+    """The foreign keys to the model (and its superclasses) that dedupe moves."""
+    relationships = []
+    for cls in [model] + model._meta.get_parent_list():
+        for relationship in cls._meta.related_objects:
+            if relationship.one_to_many and relationship.field not in [
+                    rel.field for rel in relationships]:
+                relationships.append(relationship)
+    return relationships
 
-    attr = relationship.get_accessor_name()
-    attr_val = getattr(model, attr, None)
-    queryset = attr_val.get_queryset() if attr_val else []
-    return queryset
+
+def get_saved_true_model_id(sender, instance):
+    """
+    The instance's true_model_id as last loaded or saved; only fetched
+    if the instance didn't come from the database with it.
+    """
+    if instance.pk is None:
+        return None
+    if not hasattr(instance, '_saved_true_model_id'):
+        instance._saved_true_model_id = sender._base_manager \
+            .filter(pk=instance.pk) \
+            .values_list('true_model_id', flat=True) \
+            .first()
+    return instance._saved_true_model_id
 
 
 @transaction.atomic
+def move_back(model, instance_id, true_model_id):
+    """
+    Moves the foreign keys that dedupe moved to the true model back
+    to the deduped model, from its log entries: one UPDATE per
+    relationship, and the entries are deleted.
+
+    Returns the number of objects moved back.
+    """
+    from .models import DedupeLogEntry
+    relationships = get_dedupe_relationships(model)
+    if not relationships:
+        return 0
+
+    # Only the model's own entries (those of its relationships), as
+    # another deduped model can have rows with the same ids.
+    entries = DedupeLogEntry.objects \
+        .filter(old_true_model_id=instance_id, true_model_id=true_model_id) \
+        .filter(reduce(operator.or_, [
+            Q(content_type=ContentType.objects.get_for_model(relationship.related_model),
+              prop_name=relationship.field.name)
+            for relationship in relationships]))
+    entry_ids, object_ids = [], defaultdict(list)
+    for entry_id, class_name, prop_name, object_id in entries.values_list(
+            'id', 'class_name', 'prop_name', 'object_id'):
+        entry_ids.append(entry_id)
+        object_ids[(class_name, prop_name)].append(object_id)
+    if not entry_ids:
+        return 0
+
+    num_moved = 0
+    for relationship in relationships:
+        related_model, field = relationship.related_model, relationship.field
+        pks = object_ids.get((related_model.__name__, field.name), [])
+        for first in range(0, len(pks), REVERT_BATCH_SIZE):
+            # (Only those still on the true model; others have moved since.)
+            num_moved += related_model._base_manager \
+                .filter(pk__in=pks[first:first + REVERT_BATCH_SIZE],
+                        **{field.attname: true_model_id}) \
+                .update(**{field.attname: instance_id})
+
+    for first in range(0, len(entry_ids), REVERT_BATCH_SIZE):
+        DedupeLogEntry.objects.filter(pk__in=entry_ids[first:first + REVERT_BATCH_SIZE]).delete()
+
+    dedupe_reverted.send(sender=model, instance_id=instance_id,
+                         true_model_id=true_model_id)
+    return num_moved
+
+
 def revert_dedupe(sender, instance, **kwargs):
     """
-    Pre-save: if true_model was previously set, revert all foregn
-    keys to point back to the actual model.
+    Pre-save: if true_model was previously set, and is changing,
+    revert all foreign keys to point back to the actual model.
     """
-    # Get the model as it was before save.
-    try:
-        old_model = sender.objects.get(id=instance.id)
-    except sender.DoesNotExist:
-        return
-    else:
-        if old_model.true_model_id is None:
-            return
-
-    true_model = sender.objects.get(id=old_model.true_model_id)
-
-    # Loop through foreign key relationships.
-    for tm in model_and_supers(true_model):
-        for relationship in tm._meta.related_objects:
-            for obj in get_related_queryset(tm, relationship):
-                # Make sure there's a log entry setting the
-                # true_model_id to true_model on this object.
-                #
-                # Otherwise, this is just an actual direct entry
-                #   for the true model.
-                from .models import DedupeLogEntry
-                log_entries = DedupeLogEntry.objects.filter(
-                    object_id=obj.pk,
-                    old_true_model_id=instance.id, true_model_id=tm.id,
-                    class_name=obj.__class__.__name__,
-                    prop_name=relationship.field.name)
-                if log_entries.count() == 0:
-                    # print("No matching log entry for %s" % obj)
-                    continue
-                else:
-                    # print("Need to revert for %s" % obj)
-                    log_entries.delete()
-
-                # Reset the attribute to the original value--this model instance.
-                setattr(obj, relationship.field.name, instance)
-                obj.save()
+    saved_true_model_id = get_saved_true_model_id(sender, instance)
+    if saved_true_model_id is not None and \
+            saved_true_model_id != instance.true_model_id:
+        move_back(sender, instance.id, saved_true_model_id)
+
+    return instance
+
+
+def revert_dedupe_on_delete(sender, instance, **kwargs):
+    """Pre-delete: if true_model is set, revert all foreign keys."""
+    saved_true_model_id = get_saved_true_model_id(sender, instance)
+    if saved_true_model_id is not None:
+        move_back(sender, instance.id, saved_true_model_id)
 
     return instance
 
 
 @transaction.atomic
+def move_related(model, instance_id, true_model_id):
+    """
+    Moves the foreign keys to a deduped model over to its true model:
+    one UPDATE per relationship, with a log entry for each object moved
+    (saved in bulk).
+
+    Returns the number of objects moved.
+    """
+    from .models import DedupeLogEntry
+    user, _ = User.objects.get_or_create(username='DedupeUser')
+
+    num_moved = 0
+    for relationship in get_dedupe_relationships(model):
+        related_model, field = relationship.related_model, relationship.field
+        related = related_model._base_manager \
+            .filter(**{field.attname: instance_id}) \
+            .order_by()
+        pks = list(related.values_list('pk', flat=True))
+        if not pks:
+            continue
+
+        # Log first, as the log holds the old values.
+        content_type = ContentType.objects.get_for_model(related_model)
+        DedupeLogEntry.objects.bulk_create([
+            DedupeLogEntry(
+                object_id=pk, action_flag=ADDITION, user_id=user.id,
+                object_repr=('%s #%s' % (related_model._meta.verbose_name, pk))[:200],
+                content_type_id=content_type.pk,
+                true_model_id=true_model_id,
+                old_true_model_id=instance_id,
+                class_name=related_model.__name__,
+                prop_name=field.name)
+            for pk in pks])
+        related.update(**{field.attname: true_model_id})
+        num_moved += len(pks)
+
+    if num_moved:
+        dedupe_applied.send(sender=model, instance_id=instance_id,
+                            true_model_id=true_model_id)
+    return num_moved
+
+
 def apply_dedupe(sender, instance, **kwargs):
-    """Post-save: set up any new."""
-    if instance.true_model_id is not None:
-        true_model = sender.objects.get(id=instance.true_model_id)
-        for inst, tm in zip(model_and_supers(instance), model_and_supers(true_model)):
-            # Migrate any foreign keys from the instance to the true_model
-            for relationship in inst._meta.related_objects:
-                for obj in get_related_queryset(inst, relationship):
-                    # Add a log entry, for an auto-created user.
-                    user, _ = User.objects.get_or_create(username='DedupeUser')
-                    from .models import DedupeLogEntry
-                    log_entry = DedupeLogEntry(
-                        object_id=obj.pk, object_repr=str(obj)[:200], action_flag=ADDITION,
-                        content_type_id=ContentType.objects.get_for_model(obj).pk,
-                        user_id=user.id,
-                        true_model_id=tm.id,
-                        old_true_model_id=getattr(obj, relationship.field.name).id,
-                        class_name=obj.__class__.__name__,
-                        prop_name=relationship.field.name)
-                    log_entry.save()
-
-                    # Set the actual data; must be done after log as the logging
-                    # assumes this value is the old value.
-                    setattr(obj, relationship.field.name, tm)
-                    obj.save()
+    """
+    Post-save: move anything related over to the true model.
+
+    With settings.DEDUPE_IN_BACKGROUND, this is left to the
+    applydedupes command (e.g. run from cron) instead.
+    """
+    saved_true_model_id = getattr(instance, '_saved_true_model_id', None)
+    instance._saved_true_model_id = instance.true_model_id
+    if instance.true_model_id is not None and \
+            instance.true_model_id != saved_true_model_id and \
+            not getattr(settings, 'DEDUPE_IN_BACKGROUND', False):
+        move_related(sender, instance.id, instance.true_model_id)
 
     return instance
 
@@ -106,5 +184,6 @@ def add_dedupe_signals(cls):
     """Class decorator to add signals needed to dedupe."""
     receiver(pre_save, sender=cls)(revert_dedupe)
     receiver(post_save, sender=cls)(apply_dedupe)
-    receiver(pre_delete, sender=cls)(revert_dedupe)
+    receiver(pre_delete, sender=cls)(revert_dedupe_on_delete)
+    deduped_models.append(cls)
     return cls
@@ -0,0 +1,158 @@
+from django.contrib.admin.models import ADDITION, LogEntry
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from finance.models import Committee, Employer
+from generic_dedupe import CanonicalIdMap
+from generic_dedupe.candidates import DuplicateFinder
+from generic_dedupe.models import DedupeLogEntry
+from locality.models import City, State, ZipCode
+
+
+class DedupeTest(TestCase):
+    def setUp(self):
+        state = State.objects.create(name='California', short_name='CA')
+        self.city = City.objects.create(name='Oakland', state=state)
+        self.duplicate = City.objects.create(name='Oakland (dup)', state=state)
+
+        # Related through City (ZipCode.city), and through Locality (Committee.locality).
+        self.zip_codes = [ZipCode.objects.create(name='94612', city=self.duplicate)
+                          for _ in range(3)]
+        self.committee = Committee.objects.create(name='Yes on A', type='PF',
+                                                  locality=self.duplicate)
+
+    def assert_related_to(self, city):
+        self.assertEqual(set([city.id]), set([ZipCode.objects.get(id=zc.id).city_id
+                                              for zc in self.zip_codes]))
+        self.assertEqual(city.id, Committee.objects.get(id=self.committee.id).locality_id)
+
+    def dedupe(self):
+        self.duplicate.true_model_id = self.city.id
+        self.duplicate.save()
+
+    def test_dedupe_and_revert(self):
+        self.dedupe()
+        self.assert_related_to(self.city)
+        self.assertEqual(4, DedupeLogEntry.objects.count())
+        entry = DedupeLogEntry.objects.get(class_name='Committee')
+        self.assertEqual(('locality', str(self.committee.id), self.duplicate.id, self.city.id),
+                         (entry.prop_name, entry.object_id, entry.old_true_model_id,
+                          entry.true_model_id))
+        self.assertIn('Committee.locality', entry.change_message)
+
+        self.undo_dedupe()
+        self.assert_related_to(self.duplicate)
+        self.assertEqual(0, DedupeLogEntry.objects.count())
+
+    def test_revert_keeps_other_models_entries(self):
+        self.dedupe()
+        # (Logged by dedupe of some other model, with the same ids.)
+        other = DedupeLogEntry.objects.create(
+            object_id='1', action_flag=ADDITION, object_repr='Employer #1',
+            user=User.objects.get(username='DedupeUser'),
+            content_type=ContentType.objects.get_for_model(Employer),
+            class_name='Employer', prop_name='name',
+            true_model_id=self.city.id, old_true_model_id=self.duplicate.id)
+
+        self.undo_dedupe()
+        self.assert_related_to(self.duplicate)
+        self.assertEqual([other.id], list(DedupeLogEntry.objects.values_list('id', flat=True)))
+
+    def test_bulk_create_log_entries(self):
+        user = User.objects.create(username='DedupeUser')
+        content_type = ContentType.objects.get_for_model(ZipCode)
+        entries = [DedupeLogEntry(object_id=str(pk), action_flag=ADDITION, user=user,
+                                  object_repr='Zip code', content_type=content_type,
+                                  class_name='ZipCode', prop_name='city',
+                                  true_model_id=2, old_true_model_id=1)
+                   for pk in (3, 1, 2, 1, 3)]
+        with self.assertNumQueries(3):
+            DedupeLogEntry.objects.bulk_create(entries, batch_size=2)
+
+        self.assertEqual(
+            sorted([(entry.object_id, 'Changed ZipCode.city for Zip code from 1 to 2')
+                    for entry in entries]),
+            sorted(DedupeLogEntry.objects.values_list('object_id', 'change_message')))
+        self.assertFalse(LogEntry.objects.exists())  # (not in the admin's log)
+
+    def undo_dedupe(self):
+        self.duplicate.true_model_id = None
+        self.duplicate.save()
+
+    def test_dedupe_queries_per_relationship(self):
+        self.dedupe()  # (creates the dedupe user, caches content types)
+        self.undo_dedupe()
+        with CaptureQueriesContext(connection) as few_queries:
+            self.dedupe()
+
+        with CaptureQueriesContext(connection) as few_revert_queries:
+            self.undo_dedupe()
+
+        self.zip_codes += [ZipCode.objects.create(name='94612', city=self.duplicate)
+                           for _ in range(10)]
+        with CaptureQueriesContext(connection) as many_queries:
+            self.dedupe()
+        self.assert_related_to(self.city)
+        self.assertEqual(len(few_queries), len(many_queries))
+
+        with CaptureQueriesContext(connection) as many_revert_queries:
+            self.undo_dedupe()
+        self.assert_related_to(self.duplicate)
+        self.assertEqual(len(few_revert_queries), len(many_revert_queries))
+
+    def test_save_without_dedupe_change(self):
+        self.dedupe()
+        city = City.objects.get(id=self.duplicate.id)
+        with CaptureQueriesContext(connection) as queries:
+            city.name = 'Oakland (duplicate)'
+            city.save()
+        self.assertEqual([], [query for query in queries
+                              if 'SELECT' in query['sql'] or 'dedupe' in query['sql']])
+        self.assert_related_to(self.city)
+
+    @override_settings(DEDUPE_IN_BACKGROUND=True)
+    def test_dedupe_in_background(self):
+        self.dedupe()
+        self.assert_related_to(self.duplicate)
+
+        call_command('applydedupes', verbosity=0)
+        self.assert_related_to(self.city)
+        self.assertEqual(4, DedupeLogEntry.objects.count())
+
+    def test_canonical_ids(self):
+        self.dedupe()
+        state = self.city.state
+        true_city = City.objects.create(name='Oakland, CA', state=state)
+        self.city.true_model_id = true_city.id
+        self.city.save()
+
+        canonical_ids = CanonicalIdMap(City)
+        self.assertEqual(true_city.id, canonical_ids.get_canonical_id(self.duplicate.id))
+        self.assertEqual(true_city.id, canonical_ids.get_canonical_id(true_city.id))
+        self.assertEqual((true_city, False),
+                         canonical_ids.get_or_create(name='Oakland (dup)', state=state))
+        self.assertEqual((true_city, False),
+                         canonical_ids.get_or_create(name='Oakland, CA', state=state))
+        city, created = canonical_ids.get_or_create(name='Berkeley', state=state)
+        self.assertTrue(created)
+        self.assertEqual(city.id, canonical_ids.get_canonical_id(city.id))
+
+
+class DuplicateFinderTest(TestCase):
+    def test_find(self):
+        finder = DuplicateFinder()
+        for pk, name in enumerate(['Jon Smith', 'John Smith', 'Jane Doe',
+                                   'John Smith Jr', 'Bob Doe']):
+            finder.add(pk, name, keys=[name.split()[-1]])
+        self.assertEqual([[0, 1, 3]], [pks for _, pks in finder.find()])
+
+    def test_large_blocks_are_skipped(self):
+        finder = DuplicateFinder(max_block_size=2)
+        for pk in range(3):
+            finder.add(pk, 'Smith', keys=['smith'])
+        self.assertEqual([], finder.find())
+        self.assertGreater(finder.num_skipped_blocks, 0)
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def set_concrete_types(apps, app_label, base_name, subclass_names):
+    """Sets concrete_type on existing rows (the first matching subclass wins)."""
+    base = apps.get_model(app_label, base_name)
+    for subclass_name in reversed(subclass_names):
+        subclass = apps.get_model(app_label, subclass_name)
+        base.objects.filter(pk__in=subclass.objects.values('pk')) \
+            .update(concrete_type=subclass_name.lower())
+    base.objects.filter(concrete_type=None).update(concrete_type=base_name.lower())
+
+
+def backfill_concrete_types(apps, schema_editor):
+    set_concrete_types(apps, 'locality', 'Locality', ('City', 'County', 'State'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locality', '0003_auto_20160823_0503'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='locality',
+            name='concrete_type',
+            field=models.CharField(default=None, editable=False, max_length=64, blank=True, help_text='Model name of the concrete subclass (none if unknown)', null=True),
+        ),
+        migrations.RunPython(backfill_concrete_types, migrations.RunPython.noop),
+    ]
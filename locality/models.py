@@ -6,8 +6,50 @@ from django.utils.encoding import python_2_unicode_compatible
 from generic_dedupe import add_dedupe_signals, DedupeMixin
 
 
+class ConcreteTypeMixin(models.Model):
+    """
+    Adds the 'concrete_type' field: the model name of the subclass
+    an object really is (its own model name if none), set on save.
+    """
+    concrete_type = models.CharField(
+        max_length=64, blank=True, null=True, default=None, editable=False,
+        help_text="Model name of the concrete subclass (none if unknown)")
+
+    def save(self, *args, **kwargs):
+        if self.concrete_type is None or self._meta.parents:
+            self.concrete_type = self._meta.model_name
+        super(ConcreteTypeMixin, self).save(*args, **kwargs)
+
+    class Meta:
+        abstract = True
+
+
 class ReverseLookupStringMixin(object):
+    """
+    Gets the subclass an object really is, by its concrete_type
+    (see ConcreteTypeMixin) if known.
+    """
+    @classmethod
+    def reverse_relationships(cls):
+        """OneToOne relations to subclasses, by the subclass model name."""
+        return dict([(rel.related_model._meta.model_name, rel)
+                     for rel in cls._meta.related_objects
+                     if isinstance(rel, OneToOneRel) and rel.parent_link])
+
     def reverse_lookup(self):
+        if not hasattr(self, '_reverse_lookup'):  # (else, see reverse_lookup_all)
+            self._reverse_lookup = self._reverse_lookup_uncached()
+        return self._reverse_lookup
+
+    def _reverse_lookup_uncached(self):
+        concrete_type = getattr(self, 'concrete_type', None)
+        if concrete_type == self._meta.model_name:
+            return None
+        relationship = self.reverse_relationships().get(concrete_type)
+        if relationship is not None:
+            return getattr(self, relationship.name)
+
+        # Unknown type; look for it.
         for relationship in self._meta.related_objects:
             attr = relationship.name
             if (isinstance(relationship, OneToOneRel) and hasattr(self, attr)):
@@ -23,9 +65,52 @@ class ReverseLookupStringMixin(object):
         return unicode(obj) if obj else ''
 
 
+def reverse_lookup_all(objects, *select_related):
+    """
+    Does reverse_lookup for many objects (of one model) at once,
+    with a query per subclass present (rather than per object).
+
+    The results are returned (in order), and kept by each object
+    for its later calls to reverse_lookup. With no select_related
+    fields, all non-null foreign keys are selected (as for
+    QuerySet.select_related).
+    """
+    objects = list(objects)
+    if not objects:
+        return []
+    model = objects[0]._meta.model
+    relationships = model.reverse_relationships()
+
+    # Group by subclass; those of unknown type could be any.
+    pks_by_type = dict()
+    for obj in objects:
+        concrete_type = getattr(obj, 'concrete_type', None)
+        if concrete_type in relationships:
+            pks_by_type.setdefault(concrete_type, set()).add(obj.pk)
+        elif concrete_type is None:
+            for concrete_type in relationships:
+                pks_by_type.setdefault(concrete_type, set()).add(obj.pk)
+
+    lookups = dict()
+    for relationship in reversed([rel for rel in model._meta.related_objects
+                                  if rel in relationships.values()]):  # first one wins
+        pks = pks_by_type.get(relationship.related_model._meta.model_name)
+        if not pks:
+            continue
+        related = relationship.related_model.objects \
+            .select_related(*select_related) \
+            .filter(**{'%s__in' % relationship.field.name: pks})
+        lookups.update([(getattr(obj, relationship.field.attname), obj)
+                        for obj in related])
+
+    for obj in objects:
+        obj._reverse_lookup = lookups.get(obj.pk)
+    return [obj._reverse_lookup for obj in objects]
+
+
 @python_2_unicode_compatible
 @add_dedupe_signals
-class Locality(DedupeMixin, ReverseLookupStringMixin):
+class Locality(DedupeMixin, ConcreteTypeMixin, ReverseLookupStringMixin):
     """
     A base table that gives a globally unique ID to any
     location (city, state, etc)
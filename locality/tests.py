@@ -3,7 +3,7 @@ from django.test import TestCase
 
 from rest_framework.test import APITestCase
 
-from locality.models import City, State, County
+from locality.models import City, County, Locality, State, reverse_lookup_all
 
 
 class LocalityTest(TestCase):
@@ -46,3 +46,42 @@ class LocalityStringTest(LocalityTest):
 
             self.assertNotEqual('', str(obj), cls.__name__)
             self.assertNotEqual('', unicode(obj), cls.__name__)
+
+
+class ReverseLookupTest(LocalityTest):
+    def test_concrete_type(self):
+        for obj, concrete_type in [(self.state, 'state'), (self.city, 'city'),
+                                   (self.county, 'county')]:
+            self.assertEqual(concrete_type, obj.concrete_type)
+            locality = Locality.objects.get(id=obj.id)
+            self.assertEqual(concrete_type, locality.concrete_type)
+
+            # One query to fetch the subclass, then none.
+            with self.assertNumQueries(1):
+                self.assertEqual(obj, locality.reverse_lookup())
+            with self.assertNumQueries(0):
+                self.assertEqual(concrete_type, locality.type())
+            self.assertEqual(unicode(obj), unicode(locality))
+
+        locality = Locality.objects.create(name='Nowhere')
+        self.assertEqual('locality', locality.concrete_type)
+        with self.assertNumQueries(0):
+            self.assertIsNone(locality.reverse_lookup())
+
+    def test_unknown_concrete_type(self):
+        Locality.objects.filter(id=self.city.id).update(concrete_type=None)
+        locality = Locality.objects.get(id=self.city.id)
+        self.assertEqual(self.city, locality.reverse_lookup())
+        self.assertEqual([self.city], reverse_lookup_all([locality]))
+
+    def test_reverse_lookup_all(self):
+        localities = Locality.objects.filter(
+            id__in=[self.city.id, self.county.id, self.state.id])
+        with self.assertNumQueries(4):  # (one for the localities)
+            concrete = reverse_lookup_all(localities)
+        self.assertEqual(set([self.city, self.county, self.state]), set(concrete))
+
+        # Only the subclasses there are queried.
+        cities = Locality.objects.filter(id=self.city.id)
+        with self.assertNumQueries(2):
+            self.assertEqual([self.city], reverse_lookup_all(cities))
@@ -2,6 +2,7 @@ from django.conf.urls import patterns, url
 from django.contrib import admin
 
 from . import views
+from _django_utils.cache import cache_response
 
 admin.autodiscover()
 
@@ -9,5 +10,5 @@ urlpatterns = patterns(
     '',
     # Details for specific objects
     url(r'^locality/(?P<locality_id>[0-9]+)$',
-        views.LocalityViewSet.as_view(actions={'get': 'retrieve'}),
+        cache_response(views.LocalityViewSet.as_view(actions={'get': 'retrieve'})),
         name='locality_get'))
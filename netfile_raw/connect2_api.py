@@ -1,11 +1,18 @@
 import logging
+import threading
+import time
+from multiprocessing.pool import ThreadPool
 
+import requests
 from swaggerpy.client import SwaggerClient
 
 logger = logging.getLogger(__name__)
 
 CONNECT2_SPEC = "https://netfile.com/Connect2/api/resources"
 
+# Responses worth retrying; anything else non-200 is an error.
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
 
 def paginated_query(func):
     """
@@ -13,48 +20,93 @@ def paginated_query(func):
 
     Decorates the query by returning a generator, making
     additional requests for each page of responses.
-    """
-
-    def _paginated_query(self, query):
-        page_index = 0
-        query.update({'currentPageIndex': page_index})
 
-        while True:
-            # Fetch the current page
-            query['currentPageIndex'] = page_index
-            response = func(self, query)
-            assert response.status_code == 200
-
-            # Report what was done.
-            pages = response.json()['totalMatchingPages']
-            logger.info("Fetched page %d of %d pages available" %
-                        (page_index + 1, pages))
-
-            # Return the results
-            results = response.json()['results']
-            for result in results:
-                yield result
+    The first page says how many pages there are; with a concurrency
+    above 1, the rest are then fetched that many at a time, but
+    still yielded in order. The query's concurrency defaults to the
+    client's; pass concurrency=1 when already querying on many threads.
+    """
 
-            # Increment the page count
-            if page_index >= pages:
-                break
-            page_index += 1
+    def _fetch_page(self, query, page_index):
+        query = dict(query, currentPageIndex=page_index)
+        data = func(self, query).json()
+
+        # Report what was done.
+        logger.info("Fetched page %d of %d pages available" %
+                    (page_index + 1, data['totalMatchingPages']))
+        return data
+
+    def _paginated_query(self, query, concurrency=None):
+        concurrency = concurrency or self.concurrency
+        data = _fetch_page(self, query, 0)
+        pages = data['totalMatchingPages']
+        for result in data['results']:
+            yield result
+
+        page_indices = range(1, pages + 1)
+        if concurrency <= 1:
+            for page_index in page_indices:
+                for result in _fetch_page(self, query, page_index)['results']:
+                    yield result
+            return
+
+        # Only hold on to a window of pages at a time.
+        pool = ThreadPool(concurrency)
+        try:
+            for start in range(0, len(page_indices), concurrency):
+                window = page_indices[start:start + concurrency]
+                for data in pool.map(lambda pi: _fetch_page(self, query, pi), window):
+                    for result in data['results']:
+                        yield result
+        finally:
+            pool.terminate()
 
     return _paginated_query
 
 
 class Connect2API(object):
-    """Netfile Connect2 API"""
+    """
+    Netfile Connect2 API
+
+    At most concurrency requests are made at once (over all threads);
+    failed requests are retried, backing off exponentially.
+    """
 
-    def __init__(self):
-        self.api = SwaggerClient(CONNECT2_SPEC)
+    def __init__(self, spec_url=CONNECT2_SPEC, concurrency=1, retries=3, backoff=1.):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1, not %r" % (concurrency,))
+        self.api = SwaggerClient(str(spec_url))
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self._request_slots = threading.BoundedSemaphore(concurrency)
+
+    def request(self, operation, **kwargs):
+        """Calls a swagger operation, retrying on failure."""
+        for attempt in range(self.retries + 1):
+            try:
+                with self._request_slots:
+                    response = operation(**kwargs)
+            except requests.RequestException as ex:
+                if attempt == self.retries:
+                    raise
+                logger.warning("%s failed (%s); retrying." % (operation, ex))
+            else:
+                retry = response.status_code in RETRY_STATUS_CODES
+                if not retry or attempt == self.retries:
+                    break
+                logger.warning("%s failed (HTTP %d); retrying." % (
+                    operation, response.status_code))
+            time.sleep(self.backoff * 2 ** attempt)
+
+        assert response.status_code == 200
+        return response
 
     def getpubliccampaignagencies(self):
         """
         GET /public/campaign/agencies
         """
-        response = self.api.public.Agencies()
-        assert response.status_code == 200
+        response = self.request(self.api.public.Agencies)
 
         data = response.json()
         assert 'agencies' in data
@@ -66,4 +118,4 @@ class Connect2API(object):
         """
         POST /public/campaign/export/cal201/transaction/year
         """
-        return self.api.public.ByYear(Year=query)
+        return self.request(self.api.public.ByYear, Year=query)
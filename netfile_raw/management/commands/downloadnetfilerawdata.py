@@ -5,17 +5,20 @@ Command to download and load California campaign finance data from Netfile.
 import os
 import os.path as op
 import csv
-import cStringIO
-import codecs
+import gzip
+import json
 from itertools import product
+from multiprocessing.pool import ThreadPool
+import threading
 import warnings
 
 import calaccess_raw
 from calaccess_raw.management.commands import loadcalaccessrawfile
 from django.conf import settings
+from django.core.management.base import CommandError
 from optparse import make_option
 
-from netfile_raw.connect2_api import Connect2API
+from netfile_raw.connect2_api import CONNECT2_SPEC, Connect2API
 
 
 custom_options = (
@@ -40,6 +43,37 @@ custom_options = (
         default=False,
         help="Re-download files that already exist?"
     ),
+    make_option(
+        "--incremental",
+        action="store_true",
+        dest="incremental",
+        default=False,
+        help="Only fetch transactions newer than those already downloaded, "
+             "and append them to the downloaded files"
+    ),
+    make_option(
+        "--concurrency",
+        action="store",
+        type="int",
+        dest="concurrency",
+        default=1,
+        help="Maximum number of Netfile requests to make at once"
+    ),
+    make_option(
+        "--gzip",
+        action="store_true",
+        dest="gzip",
+        default=False,
+        help="Keep downloaded agency/year files gzipped"
+    ),
+    make_option(
+        "--parquet",
+        action="store_true",
+        dest="parquet",
+        default=False,
+        help="Also combine the data into a Parquet file (needs pyarrow), "
+             "which xformnetfilerawdata then reads instead of the CSV"
+    ),
     make_option(
         "--skip-download",
         action="store_true",
@@ -64,6 +98,27 @@ custom_options = (
 )
 
 
+# Write files in 1MB blocks.
+BUFFER_SIZE = 2 ** 20
+
+
+def open_csv(csv_path, mode='r'):
+    """Opens a CSV file (gzipped, if it ends in .gz) with a large buffer."""
+    if csv_path.endswith('.gz'):
+        return gzip.open(csv_path, mode + 'b')
+    return open(csv_path, mode, BUFFER_SIZE)
+
+
+def import_pyarrow():
+    """pyarrow is only needed for --parquet, so is imported on demand."""
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa
+    except ImportError:
+        raise CommandError("--parquet requires pyarrow; pip install pyarrow")
+    return pyarrow
+
+
 def get_download_directory():
     """
     Returns the download directory where we will store downloaded data.
@@ -74,40 +129,93 @@ def get_download_directory():
         return calaccess_raw.get_download_directory()
 
 
+def transaction_date(item):
+    """2015-05-11T00:00:00.0000000-07:00 => 2015-05-11"""
+    date = item.get('tran_Date')
+    if date is None or date == 'None':  # 'None' once written to CSV
+        return ''
+    return unicode(date)[:10]
+
+
+def scan_watermark(csv_path):
+    """
+    Computes the watermark of a downloaded CSV: its latest tran_Date,
+    and the netFileKeys of the transactions on that date.
+    """
+    watermark = {'tran_Date': '', 'netFileKeys': []}
+    with open_csv(csv_path, 'r') as csv_handle:
+        for item in track_watermark(watermark, csv.DictReader(csv_handle)):
+            pass
+    return watermark
+
+
+def track_watermark(watermark, transactions):
+    """
+    Passes transactions through, raising watermark to the latest seen.
+    """
+    for item in transactions:
+        date = transaction_date(item)
+        if date > watermark['tran_Date']:
+            watermark['tran_Date'] = date
+            watermark['netFileKeys'] = [item['netFileKey']]
+        elif date and date == watermark['tran_Date']:
+            watermark['netFileKeys'].append(item['netFileKey'])
+        yield item
+
+
+def newer_transactions(transactions, since, seen_keys):
+    """
+    Yields transactions (sorted by date descending) dated since,
+    but not in seen_keys; stops as soon as an older one comes up,
+    so that pages past that are never requested.
+
+    Undated transactions can't be placed against the watermark,
+    so are skipped.
+    """
+    for item in transactions:
+        date = transaction_date(item)
+        if not date:
+            continue
+        elif date < since:
+            break
+        elif date == since and item['netFileKey'] in seen_keys:
+            continue
+        yield item
+
+
 class UnicodeDictWriter(object):
     """
     A CSV DictWriter which will write rows to CSV file "f",
     which is encoded in the given encoding.
 
-    Adapted from https://docs.python.org/2/library/csv.html#examples
+    Each value is encoded once, and written straight through to f;
+    open f with a large buffer (see open_csv).
     """
     def __init__(self, f, headers, dialect=csv.excel, encoding="utf-8",
-                 **kwds):
-        # Redirect output to a queue
-        self.queue = cStringIO.StringIO()
-        self.writer = csv.DictWriter(
-            self.queue, headers, dialect=dialect, **kwds)
-        self.stream = f
-        self.encoder = codecs.getincrementalencoder(encoding)()
+                 restval='', **kwds):
+        self.writer = csv.writer(f, dialect=dialect, **kwds)
+        self.headers = headers
+        self.encoding = encoding
+        self.restval = restval
 
     def writeheader(self):
-        self.writer.writeheader()
+        self.writer.writerow([unicode(h).encode(self.encoding)
+                              for h in self.headers])
 
     def writerow(self, row):
-        utf8_row = dict()
-        for k, v in row.iteritems():
-            utf8_row[k] = codecs.encode(unicode(v), 'utf-8')
-
-        self.writer.writerow(utf8_row)
-        # Fetch UTF-8 output from the queue ...
-        data = self.queue.getvalue()
-        data = data.decode("utf-8")
-        # ... and reencode it into the target encoding
-        data = self.encoder.encode(data)
-        # write to the target stream
-        self.stream.write(data)
-        # empty queue
-        self.queue.truncate(0)
+        encoding = self.encoding
+        values = []
+        num_found = 0
+        for header in self.headers:
+            if header in row:
+                values.append(unicode(row[header]).encode(encoding))
+                num_found += 1
+            else:
+                values.append(self.restval)
+        if num_found != len(row):
+            raise ValueError("dict contains fields not in fieldnames: %s" % (
+                ', '.join([repr(k) for k in row if k not in self.headers])))
+        self.writer.writerow(values)
 
 
 class Command(loadcalaccessrawfile.Command):
@@ -117,17 +225,28 @@ class Command(loadcalaccessrawfile.Command):
     # netfile gives us ISO8601 formatted dates, so we have to override the
     # calaccess_raw date hack with a slightly different one :)
     date_sql = "DATE_FORMAT(str_to_date(@`%s`, '%%Y-%%m-%%d'), '%%Y-%%m-%%d')"
+    # Netfile pages fetched at once, per agency/year (None: --concurrency).
+    page_concurrency = None
 
     def handle(self, *args, **options):
         # Parse command-line options
         self.database = options['database']
         self.verbosity = int(options['verbosity'])
         self.force = options['force']
+        self.incremental = options['incremental']
+        self.concurrency = options['concurrency']
+        if self.concurrency < 1:
+            raise CommandError("--concurrency must be at least 1")
+        self.gzip = options['gzip']
+        self.parquet = options['parquet']
 
         self.data_dir = os.path.join(get_download_directory(), 'csv')
         self.agency_csv_path = op.join(self.data_dir, 'netfile_agency.csv')
         self.combined_csv_path = os.path.join(
             self.data_dir, 'netfile_cal201_transaction.csv')
+        self.combined_parquet_path = os.path.join(
+            self.data_dir, 'netfile_cal201_transaction.parquet')
+        self.watermarks_path = op.join(self.data_dir, 'netfile_watermarks.json')
 
         # Process the --agency flag by setting self.agencies to an array of
         # agency shortcuts that exist and should be processed:
@@ -179,30 +298,123 @@ class Command(loadcalaccessrawfile.Command):
             print("Downloading data for %d agencies in years %s" % (
                 len(self.agencies), ','.join(self.years)))
 
-        for agency, year in product(self.agencies, self.years):
-            csv_path = 'netfile_%s_%s_cal201_export.csv' % (year, agency)
-            csv_path = os.path.join(self.data_dir, csv_path)
-            # Only download on demand.
-            if self.force or not op.exists(csv_path):
-                agency_id = filter(lambda ag: ag['shortcut'] == agency,
-                                   self.agencies_metadata)[0]['id']
-                transactions = self.fetch_transactions_agency_year(
-                    agency_id, year)
-                self._write_csv(csv_path, transactions)
+        # Kept even without --incremental, so that rewritten files
+        # don't keep their old watermarks.
+        watermarks = self.read_watermarks()
+        self.watermarks_lock = threading.Lock()
+        agency_years = list(product(self.agencies, self.years))
+        if self.concurrency > 1 and len(agency_years) > 1:
+            # Files are independent; the Connect2 client bounds the requests.
+            # (Each file's pages are then fetched in turn, so that there's
+            # only the one pool of threads.)
+            self.page_concurrency = 1
+            pool = ThreadPool(self.concurrency)
+            try:
+                pool.map(lambda agency_year: self.download_agency_year(
+                    *agency_year, watermarks=watermarks), agency_years)
+            finally:
+                pool.close()
+        else:
+            self.page_concurrency = self.concurrency
+            for agency, year in agency_years:
+                self.download_agency_year(agency, year, watermarks)
+
+    def get_agency_year_csv_path(self, agency, year):
+        csv_path = 'netfile_%s_%s_cal201_export.csv' % (year, agency)
+        if self.gzip:
+            csv_path += '.gz'
+        return os.path.join(self.data_dir, csv_path)
+
+    def download_agency_year(self, agency, year, watermarks):
+        csv_path = self.get_agency_year_csv_path(agency, year)
+        agency_id = filter(lambda ag: ag['shortcut'] == agency,
+                           self.agencies_metadata)[0]['id']
+        # Only download on demand.
+        if self.force or not op.exists(csv_path) or (
+                self.incremental and op.getsize(csv_path) == 0):
+            # Rewritten from scratch, so the old watermark no longer holds.
+            self.save_watermark(watermarks, csv_path, None)
+            watermark = {'tran_Date': '', 'netFileKeys': []}
+            transactions = track_watermark(
+                watermark, self.fetch_transactions_agency_year(agency_id, year))
+            self._write_csv(csv_path, transactions)
+            self.save_watermark(watermarks, csv_path, watermark)
+        elif self.incremental:
+            self.download_new_transactions(
+                csv_path, agency_id, year, watermarks)
+
+    def download_new_transactions(self, csv_path, agency_id, year, watermarks):
+        """
+        Appends transactions newer than the file's watermark to csv_path.
+        """
+        saved = watermarks.get(op.basename(csv_path))
+        if saved is None:  # downloaded before watermarks were kept.
+            saved = scan_watermark(csv_path)
+        # (Only saved once the new transactions are written.)
+        watermark = dict(saved, netFileKeys=list(saved['netFileKeys']))
+
+        transactions = newer_transactions(
+            self.fetch_transactions_agency_year(agency_id, year),
+            since=watermark['tran_Date'], seen_keys=set(watermark['netFileKeys']))
+        transactions = track_watermark(watermark, transactions)
+
+        with open_csv(csv_path, 'r') as csv_handle:
+            headers = csv.reader(csv_handle).next()
+
+        if self.verbosity:
+            self.log('Appending to %s...' % op.abspath(csv_path))
+
+        num_rows = 0
+        with open_csv(csv_path, 'a') as csv_handle:
+            writer = UnicodeDictWriter(csv_handle, headers, lineterminator='\n')
+            for item in transactions:
+                writer.writerow(item)
+                num_rows += 1
+        self.save_watermark(watermarks, csv_path, watermark)
+
+        if self.verbosity:
+            self.success('%d new transactions' % num_rows)
+
+    def read_watermarks(self):
+        """Latest transactions downloaded, by file name."""
+        if not op.exists(self.watermarks_path):
+            return dict()
+        with open(self.watermarks_path, 'r') as fp:
+            return json.load(fp)
+
+    def write_watermarks(self, watermarks):
+        if not os.path.isdir(self.data_dir):
+            os.makedirs(self.data_dir)
+        tmp_path = self.watermarks_path + '.tmp'
+        with open(tmp_path, 'w') as fp:
+            json.dump(watermarks, fp, indent=2, sort_keys=True)
+        os.rename(tmp_path, self.watermarks_path)  # (never half-written)
+
+    def save_watermark(self, watermarks, csv_path, watermark):
+        """
+        Sets csv_path's watermark (None: unknown), and writes them all
+        out; called as soon as csv_path is written, so that the file
+        and its watermark agree even if a later download fails.
+        """
+        with self.watermarks_lock:
+            if watermark is None:
+                if watermarks.pop(op.basename(csv_path), None) is None:
+                    return
+            else:
+                watermarks[op.basename(csv_path)] = watermark
+            self.write_watermarks(watermarks)
 
     def combine(self):
         headers_written = False
-        with file(self.combined_csv_path, 'w') as combined_csv:
+        with open_csv(self.combined_csv_path, 'w') as combined_csv:
             for agency, year in product(self.agencies, self.years):
-                csv_path = op.join(self.data_dir,
-                                   'netfile_%s_%s_cal201_export.csv' %
-                                   (year, agency))
+                csv_path = self.get_agency_year_csv_path(agency, year)
 
                 if not os.path.exists(csv_path):
                     warnings.warn("CSV path %s does not exist!" % csv_path)
                     continue
 
-                with file(csv_path, 'r') as agency_csv:
+                with open_csv(csv_path, 'r') as agency_csv:
                     header_line = agency_csv.readline()
                     if header_line == '':
                         continue
@@ -215,9 +427,58 @@ class Command(loadcalaccessrawfile.Command):
                         assert headers == headers_written, \
                             'Headers in %s do not match the first written csv' % (csv_path,)
 
-                    for line in agency_csv.readlines():
+                    for line in agency_csv:
                         combined_csv.write(','.join([agency, line]))
 
+        if self.parquet:
+            self.combine_parquet()
+
+    def combine_parquet(self):
+        """
+        Combines the agency/year files into one Parquet file, with one
+        row group per agency/year; an index of the row groups
+        (by '<agency>_<year>') is written next to it, as JSON.
+
+        All values are stored as strings, or null for 'None'.
+        """
+        pa = import_pyarrow()
+        import pandas as pd
+
+        if self.verbosity:
+            self.log('Writing %s...' % op.abspath(self.combined_parquet_path))
+
+        writer = None
+        index = dict()
+        try:
+            for agency, year in product(self.agencies, self.years):
+                csv_path = self.get_agency_year_csv_path(agency, year)
+                if not os.path.exists(csv_path) or op.getsize(csv_path) == 0:
+                    continue
+
+                data = pd.read_csv(csv_path, dtype=object, na_values=['None'])
+                data.insert(0, 'agency_shortcut', agency)
+                if writer is None:
+                    schema = pa.schema([pa.field(col, pa.string()) for col in data.columns])
+                    writer = pa.parquet.ParquetWriter(self.combined_parquet_path, schema)
+                else:
+                    # make sure things don't go all wierd between files.
+                    assert list(data.columns) == schema.names, \
+                        'Headers in %s do not match the first written csv' % (csv_path,)
+
+                writer.write_table(pa.Table.from_pandas(
+                    data, schema=schema, preserve_index=False))
+                index['%s_%s' % (agency, year)] = {
+                    'row_group': len(index), 'num_rows': len(data)}
+        finally:
+            if writer is not None:
+                writer.close()
+
+        with open(self.combined_parquet_path + '.json', 'w') as fp:
+            json.dump(index, fp, indent=2, sort_keys=True)
+
+        if self.verbosity:
+            self.success('OK')
+
     def load(self):
         if self.verbosity:
             self.header("Loading Agency CSV file")
@@ -254,7 +515,7 @@ class Command(loadcalaccessrawfile.Command):
             with open(csv_path, 'w') as csv_handle:
                 pass  # create empty csv, to enable caching.
         else:
-            with open(csv_path, 'w') as csv_handle:
+            with open_csv(csv_path, 'w') as csv_handle:
                 headers = item.keys()
                 writer = UnicodeDictWriter(
                     csv_handle, headers, lineterminator='\n')
@@ -266,11 +527,19 @@ class Command(loadcalaccessrawfile.Command):
             if self.verbosity:
                 self.success('OK')
 
+    _connect2_lock = threading.Lock()
+
     @property
     def connect2(self):
-        """ Connecting to netfile is slow, so only do it on demand."""
-        if getattr(self, '_connect2', None) is None:
-            self._connect2 = Connect2API()
+        """
+        Connecting to netfile is slow, so only do it on demand
+        (once, though download threads may ask at the same time).
+        """
+        with self._connect2_lock:
+            if getattr(self, '_connect2', None) is None:
+                self._connect2 = Connect2API(
+                    spec_url=getattr(settings, 'NETFILE_CONNECT2_SPEC', CONNECT2_SPEC),
+                    concurrency=self.concurrency)
         return self._connect2
 
     def fetch_transactions_agency_year(self, agency_id, year):
@@ -283,7 +552,7 @@ class Command(loadcalaccessrawfile.Command):
         }
 
         return self.connect2.postpubliccampaignexportcal201transactionyear(
-            query)
+            query, concurrency=self.page_concurrency)
 
     def fetch_agencies(self):
         """Fetches agencies from Netfile API"""
@@ -1,12 +1,20 @@
+import BaseHTTPServer
+import csv
+import json
+import os
 import os.path as op
+import shutil
 import tempfile
+import threading
 import warnings
 
 from django.conf import settings
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import TestCase, override_settings
 
 from netfile_raw import connect2_api
+from netfile_raw.management.commands import downloadnetfilerawdata
 from netfile_raw.models import NetFileCal201Transaction
 
 
@@ -87,3 +95,247 @@ class NetfileTests(TestCase):
             call_command('downloadnetfilerawdata',
                          agencies='CSD', years='1900')
             self.assertEqual(NetFileCal201Transaction.objects.all().count(), 0)
+
+
+class StubDownloadCommand(downloadnetfilerawdata.Command):
+    """Serves transactions from a list, rather than from Netfile."""
+    def __init__(self, data_dir, transactions):
+        super(StubDownloadCommand, self).__init__()
+        self.verbosity = 0
+        self.force = False
+        self.incremental = True
+        self.agencies, self.years = ['CSD'], ['2015']
+        self.agencies_metadata = [{'shortcut': 'CSD', 'id': 1}]
+        self.data_dir = data_dir
+        self.watermarks_path = op.join(data_dir, 'netfile_watermarks.json')
+        self.transactions = transactions
+        self.concurrency = 1
+        self.gzip = self.parquet = False
+        self.combined_csv_path = op.join(data_dir, 'netfile_cal201_transaction.csv')
+        self.num_fetched = 0
+
+    def fetch_transactions_agency_year(self, agency_id, year):
+        for item in self.transactions:  # sorted by date, descending
+            self.num_fetched += 1
+            yield item
+
+
+class NetfileIncrementalTests(TestCase):
+    @staticmethod
+    def xact(key, date):
+        return {'netFileKey': key, 'tran_Amt1': 1.0,
+                'tran_Date': date and '%sT00:00:00.0000000-08:00' % date}
+
+    def make_data_dir(self):
+        data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, data_dir)
+        return data_dir
+
+    def read_watermarks(self, data_dir):
+        with open(op.join(data_dir, 'netfile_watermarks.json'), 'r') as fp:
+            return json.load(fp)
+
+    def read_keys(self, data_dir, csv_name='netfile_2015_CSD_cal201_export.csv'):
+        csv_path = op.join(data_dir, csv_name)
+        with downloadnetfilerawdata.open_csv(csv_path, 'r') as csv_handle:
+            return [row['netFileKey'] for row in csv.DictReader(csv_handle)]
+
+    def test_incremental_download_appends_new_transactions(self):
+        data_dir = self.make_data_dir()
+        old = [self.xact('c', '2015-02-01'), self.xact('b', '2015-01-01'),
+               self.xact('a', '2015-01-01')]
+        StubDownloadCommand(data_dir, old).download()
+        self.assertEqual(['c', 'b', 'a'], self.read_keys(data_dir))
+
+        new = [self.xact('e', '2015-03-01'), self.xact('d', '2015-02-01'),
+               self.xact('x', None)] + old
+        command = StubDownloadCommand(data_dir, new)
+        command.download()
+        self.assertEqual(['c', 'b', 'a', 'e', 'd'], self.read_keys(data_dir))
+        self.assertEqual(5, command.num_fetched)  # stopped at 'b'
+
+        self.assertEqual(
+            {'tran_Date': '2015-03-01', 'netFileKeys': ['e']},
+            self.read_watermarks(data_dir)['netfile_2015_CSD_cal201_export.csv'])
+
+        # Nothing new: nothing appended.
+        StubDownloadCommand(data_dir, new).download()
+        self.assertEqual(['c', 'b', 'a', 'e', 'd'], self.read_keys(data_dir))
+
+    def test_incremental_download_without_watermark(self):
+        data_dir = self.make_data_dir()
+        old = [self.xact('b', '2015-01-01'), self.xact('a', '2015-01-01')]
+        StubDownloadCommand(data_dir, old).download()
+        os.remove(op.join(data_dir, 'netfile_watermarks.json'))
+
+        new = [self.xact('c', '2015-01-01')] + old
+        StubDownloadCommand(data_dir, new).download()
+        self.assertEqual(['b', 'a', 'c'], self.read_keys(data_dir))
+
+    def test_forced_download_resets_watermark(self):
+        data_dir = self.make_data_dir()
+        StubDownloadCommand(data_dir, [self.xact('b', '2015-02-01')]).download()
+
+        # Rewritten from scratch (without --incremental) with older data.
+        command = StubDownloadCommand(data_dir, [self.xact('a', '2015-01-01')])
+        command.force, command.incremental = True, False
+        command.download()
+        self.assertEqual(
+            {'tran_Date': '2015-01-01', 'netFileKeys': ['a']},
+            self.read_watermarks(data_dir)['netfile_2015_CSD_cal201_export.csv'])
+
+        new = [self.xact('c', '2015-01-15'), self.xact('a', '2015-01-01')]
+        StubDownloadCommand(data_dir, new).download()
+        self.assertEqual(['a', 'c'], self.read_keys(data_dir))
+
+    def test_watermark_saved_with_each_file(self):
+        data_dir = self.make_data_dir()
+        command = StubDownloadCommand(data_dir, [self.xact('a', '2015-01-01')])
+        command.years = ['2015', '2016']
+        fetch = command.fetch_transactions_agency_year
+
+        def fetch_or_fail(agency_id, year):
+            if year == '2016':
+                raise IOError()
+            return fetch(agency_id, year)
+
+        command.fetch_transactions_agency_year = fetch_or_fail
+        self.assertRaises(IOError, command.download)
+        self.assertEqual(['netfile_2015_CSD_cal201_export.csv'],
+                         list(self.read_watermarks(data_dir)))
+
+    def test_gzip_download_and_combine(self):
+        old = [self.xact('b', '2015-01-01'), self.xact(u'\xe9', '2015-01-01')]
+        new = [self.xact('c', '2015-02-01')] + old
+
+        csvs = []
+        for gzip in (False, True):
+            data_dir = self.make_data_dir()
+            for transactions in (old, new):
+                command = StubDownloadCommand(data_dir, transactions)
+                command.gzip = gzip
+                command.download()
+            command.combine()
+            with open(command.combined_csv_path, 'r') as csv_handle:
+                csvs.append(csv_handle.read())
+
+        self.assertEqual(['b', '\xc3\xa9', 'c'], self.read_keys(
+            data_dir, 'netfile_2015_CSD_cal201_export.csv.gz'))
+        self.assertEqual(csvs[0], csvs[1])
+
+
+class StubConnect2Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Serves a minimal Connect2 swagger spec, and its agencies."""
+    failures = []  # status codes to fail the next agencies requests with
+
+    def do_GET(self):
+        base_url = 'http://%s:%d/api' % self.server.server_address
+        if self.path == '/api/resources':
+            body = {'swaggerVersion': '1.2', 'basePath': base_url,
+                    'apis': [{'path': '/public', 'description': 'Public'}]}
+        elif self.path == '/api/public':
+            body = {'swaggerVersion': '1.2', 'basePath': base_url,
+                    'resourcePath': '/public', 'models': {}, 'apis': [
+                        {'path': '/public/campaign/agencies', 'operations': [
+                            {'httpMethod': 'GET', 'nickname': 'Agencies'}]},
+                        {'path': '/public/campaign/export/cal201/transaction/year',
+                         'operations': [
+                             {'httpMethod': 'POST', 'nickname': 'ByYear', 'parameters': [
+                                 {'name': 'Year', 'paramType': 'body',
+                                  'dataType': 'TransactionYearQuery'}]}]}]}
+        elif self.path == '/api/public/campaign/agencies':
+            if self.failures:
+                return self.send_error(self.failures.pop(0))
+            body = {'agencies': [{'id': 1, 'shortcut': 'CSD', 'name': 'San Diego'}]}
+        else:
+            return self.send_error(404)
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(body))
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeResponse(object):
+    status_code = 200
+
+    def __init__(self, data):
+        self.data = data
+        self.num_json_calls = 0
+
+    def json(self):
+        self.num_json_calls += 1
+        return self.data
+
+
+class Connect2APITests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super(Connect2APITests, cls).setUpClass()
+        cls.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), StubConnect2Handler)
+        thread = threading.Thread(target=cls.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        cls.spec_url = 'http://127.0.0.1:%d/api/resources' % cls.server.server_address[1]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super(Connect2APITests, cls).tearDownClass()
+
+    def test_agencies_retried(self):
+        api = connect2_api.Connect2API(spec_url=self.spec_url, backoff=0)
+        StubConnect2Handler.failures[:] = [503, 500]
+        self.assertEqual('CSD', api.getpubliccampaignagencies()[0]['shortcut'])
+        self.assertEqual([], StubConnect2Handler.failures)
+
+        StubConnect2Handler.failures[:] = [404]
+        self.assertRaises(AssertionError, api.getpubliccampaignagencies)
+
+    def fetch_pages(self, concurrency, num_pages=7, page_concurrency=None):
+        api = connect2_api.Connect2API(
+            spec_url=self.spec_url, concurrency=concurrency, backoff=0)
+        responses = []
+        failed = set()
+
+        def by_year(Year):
+            page_index = Year['currentPageIndex']
+            if page_index % 3 == 1 and page_index not in failed:
+                failed.add(page_index)
+                raise connect2_api.requests.ConnectionError()
+            responses.append(FakeResponse({
+                'totalMatchingPages': num_pages,
+                'results': [(page_index, i) for i in range(2)]}))
+            return responses[-1]
+
+        api.api.public.operations['ByYear'] = by_year
+        results = list(api.postpubliccampaignexportcal201transactionyear(
+            {'Aid': 1}, concurrency=page_concurrency))
+        self.assertEqual([1] * len(responses), [r.num_json_calls for r in responses])
+        return results
+
+    def test_paginated_query(self):
+        serial_results = self.fetch_pages(concurrency=1)
+        self.assertEqual([(pi, i) for pi in range(8) for i in range(2)], serial_results)
+        for concurrency in (2, 3, 16):
+            self.assertEqual(serial_results, self.fetch_pages(concurrency=concurrency))
+
+        # No pool of pages (e.g. within a pool of agency/year downloads).
+        thread_pool = connect2_api.ThreadPool
+        connect2_api.ThreadPool = None
+        try:
+            self.assertEqual(serial_results,
+                             self.fetch_pages(concurrency=4, page_concurrency=1))
+        finally:
+            connect2_api.ThreadPool = thread_pool
+
+    def test_bad_concurrency(self):
+        self.assertRaises(ValueError, connect2_api.Connect2API,
+                          spec_url=self.spec_url, concurrency=0)
+        self.assertRaises(CommandError, call_command, 'downloadnetfilerawdata',
+                          concurrency=0, database='default', skip_combine=True,
+                          skip_load=True)